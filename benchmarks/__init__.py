@@ -0,0 +1,10 @@
+"""Offline benchmarks for iPhone Detect.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks
+
+or, to run the integration end to end against a simulated network:
+
+    python -m benchmarks.simulator
+"""
@@ -0,0 +1,222 @@
+"""Measure scan cycle cost against synthetic neighbour tables."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from typing import Awaitable, Callable
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.iphonedetect import scanner as scanner_module
+from custom_components.iphonedetect.agent import Agent
+from custom_components.iphonedetect.coordinator import IphoneDetectUpdateCoordinator
+from custom_components.iphonedetect.scanner import (
+    NUD_REACHABLE,
+    DeviceData,
+    Pinger,
+    ScannerArp,
+    ScannerIPNeigh,
+    ScannerIPRoute,
+    ScannerProcNetArp,
+    ScannerRemote,
+    async_update_devices,
+)
+from custom_components.iphonedetect.scheduler import ProbeScheduler
+
+from .fakes import NUD_STALE, FakeDatagramTransport, FakeHass, FakeInterfaceMap, FakeIPRoute, NeighbourTable
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_TRACKED = 200
+DEFAULT_CYCLES = 20
+
+
+def make_devices(ip_addresses: list[str]) -> dict[str, DeviceData]:
+    """Return tracked devices keyed like config entries."""
+    return {
+        f"entry_{index}": DeviceData(ip_address=ip_address, consider_home=timedelta(seconds=24), title=f"Phone {index}")
+        for index, ip_address in enumerate(ip_addresses)
+    }
+
+
+def make_pinger() -> tuple[Pinger, FakeDatagramTransport]:
+    """Return a pinger that counts probes instead of sending them."""
+    pinger = Pinger(reply_timeout=0, interfaces=FakeInterfaceMap())
+    transport = pinger._transports[None] = FakeDatagramTransport()
+    return pinger, transport
+
+
+async def measure(cycles: int, func: Callable[[], Awaitable]) -> list[float]:
+    """Return the duration of each cycle in milliseconds."""
+    samples = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, size: int, tracked: int, samples: list[float]) -> None:
+    """Print one result line."""
+    p95 = statistics.quantiles(samples, n=20)[18] if len(samples) > 1 else samples[0]
+    print(f"{name:<28} {size:>8} {tracked:>8} {statistics.mean(samples):>10.3f} {p95:>10.3f}")
+
+
+async def bench_scanners(hass: FakeHass, table: NeighbourTable, tracked: list[str], cycles: int) -> None:
+    """Benchmark each scanner implementation."""
+    size = len(table.entries)
+    FakeIPRoute.table = table
+
+    with patch("pyroute2.IPRoute", FakeIPRoute):
+        scanner = ScannerIPRoute()
+        report("ScannerIPRoute dump", size, len(tracked), await measure(cycles, lambda: scanner.get_arp_records(hass)))
+        report(
+            "ScannerIPRoute targeted",
+            size,
+            len(tracked),
+            await measure(cycles, lambda: scanner.get_arp_records(hass, tracked)),
+        )
+
+    for name, scanner, output in (
+        ("ScannerIPNeigh", ScannerIPNeigh(), table.ip_neigh_output()),
+        ("ScannerArp", ScannerArp(), table.arp_output()),
+    ):
+
+        async def _get_arp_subprocess(cmd, output=output) -> list[str]:
+            return output
+
+        with patch.object(scanner_module, "get_arp_subprocess", _get_arp_subprocess):
+            report(name, size, len(tracked), await measure(cycles, lambda: scanner.get_arp_records(hass, tracked)))
+
+    with tempfile.NamedTemporaryFile("w", suffix="_arp") as file:
+        file.write(table.proc_net_arp_output())
+        file.flush()
+        scanner = ScannerProcNetArp(file.name)
+        report(
+            "ScannerProcNetArp",
+            size,
+            len(tracked),
+            await measure(cycles, lambda: scanner.get_arp_records(hass, tracked)),
+        )
+
+
+async def bench_update_devices(hass: FakeHass, table: NeighbourTable, tracked: list[str], cycles: int) -> None:
+    """Benchmark full scan cycles with every device due."""
+    FakeIPRoute.table = table
+    devices = make_devices(tracked)
+    pinger, _ = make_pinger()
+    scanner = ScannerIPRoute()
+
+    async def _cycle() -> None:
+        scheduler = ProbeScheduler(budget=len(devices), burst=len(devices))
+        await async_update_devices(hass, scanner, pinger, scheduler, devices)
+
+    with patch("pyroute2.IPRoute", FakeIPRoute):
+        report("async_update_devices", len(table.entries), len(tracked), await measure(cycles, _cycle))
+
+
+async def bench_coordinator(table: NeighbourTable, tracked: list[str], cycles: int) -> None:
+    """Benchmark the coordinator refresh run after each scan."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        devices = make_devices(tracked)
+        now = dt_util.utcnow()
+        for index, device in enumerate(devices.values()):
+            device._reachable = index % 2 == 0
+            device._last_seen = now - timedelta(seconds=index % 60)
+
+        coordinator = IphoneDetectUpdateCoordinator(hass, devices)
+        report("coordinator refresh", len(table.entries), len(tracked), await measure(cycles, coordinator.async_refresh))
+        await coordinator.async_shutdown()
+
+
+async def bench_remote(hass: FakeHass, table: NeighbourTable, tracked: list[str], cycles: int) -> None:
+    """Benchmark changes of tracked devices streamed from an agent to a remote scanner over loopback."""
+    FakeIPRoute.table = table
+    pinger, _ = make_pinger()
+    agent = Agent(hass, ScannerIPRoute(), pinger, interval=0.001)
+    client = ScannerRemote("127.0.0.1")
+
+    def _followed() -> bool:
+        """Return if the client has the reachability of the tracked devices in the table."""
+        return all(
+            (ip_address in client._neighbours) == (table.entries[ip_address][1] == NUD_REACHABLE)
+            for ip_address in tracked
+        )
+
+    async def _cycle() -> None:
+        for ip_address in tracked:
+            lladdr, state = table.entries[ip_address]
+            table.entries[ip_address] = (lladdr, NUD_STALE if state == NUD_REACHABLE else NUD_REACHABLE)
+        while not _followed():
+            await asyncio.sleep(0.0001)
+
+    with patch("pyroute2.IPRoute", FakeIPRoute):
+        server = await agent.async_start("127.0.0.1", 0)
+        client.port = server.sockets[0].getsockname()[1]
+        try:
+            await client.async_start(hass, {}, lambda _: None)
+            while not _followed():
+                await asyncio.sleep(0.0001)
+            report("ScannerRemote change", len(table.entries), len(tracked), await measure(cycles, _cycle))
+        finally:
+            await client.async_stop()
+            await agent.async_stop()
+
+    snapshot = len(agent._encode({"snapshot": agent.neighbours}))
+    changes = (agent.stats.bytes_sent - agent.stats.snapshots * snapshot) / max(agent.stats.changes, 1)
+    print(f"agent bytes: snapshot {snapshot}, change {changes:.0f} ({len(table.entries)} entries)")
+
+
+async def bench_memory(hass: FakeHass, table: NeighbourTable, tracked: list[str]) -> None:
+    """Report memory kept per tracked device after one scan cycle."""
+    FakeIPRoute.table = table
+    pinger, _ = make_pinger()
+    scanner = ScannerIPRoute()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    devices = make_devices(tracked)
+    scheduler = ProbeScheduler(budget=len(devices), burst=len(devices))
+    with patch("pyroute2.IPRoute", FakeIPRoute):
+        await async_update_devices(hass, scanner, pinger, scheduler, devices)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"memory per tracked device: {allocated / len(tracked):.0f} bytes ({len(tracked)} devices)")
+
+
+async def main(sizes: list[int], tracked_count: int, cycles: int) -> None:
+    """Run all benchmarks."""
+    hass = FakeHass(asyncio.get_running_loop())
+    print(f"{'benchmark':<28} {'table':>8} {'tracked':>8} {'mean ms':>10} {'p95 ms':>10}")
+    try:
+        for size in sizes:
+            table = NeighbourTable(size)
+            tracked = table.sample(min(tracked_count, size))
+            await bench_scanners(hass, table, tracked, cycles)
+            await bench_update_devices(hass, table, tracked, cycles)
+            await bench_coordinator(table, tracked, cycles)
+            await bench_remote(hass, table, tracked, cycles)
+
+        table = NeighbourTable(max(sizes))
+        await bench_memory(hass, table, table.sample(min(tracked_count, max(sizes))))
+    finally:
+        hass.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="neighbour table sizes")
+    parser.add_argument("--tracked", type=int, default=DEFAULT_TRACKED, help="number of tracked devices")
+    parser.add_argument("--cycles", type=int, default=DEFAULT_CYCLES, help="cycles per benchmark")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.tracked, args.cycles))
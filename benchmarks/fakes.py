@@ -0,0 +1,169 @@
+"""Stand-ins for the network and Home Assistant used by the benchmarks."""
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import random
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from ipaddress import IPv4Address
+from typing import Any, Callable
+
+from pyroute2.netlink.exceptions import NetlinkError
+
+from custom_components.iphonedetect.interfaces import InterfaceMap
+from custom_components.iphonedetect.scanner import NUD_REACHABLE
+
+NUD_STALE = 0x04
+IFINDEX = 2
+
+
+class NeighbourTable:
+    """Synthetic IPv4 neighbour table."""
+
+    def __init__(self, size: int, reachable_ratio: float = 0.5, seed: int = 0) -> None:
+        """Create `size` entries in 10.0.0.0/8, a share of them reachable."""
+        rand = random.Random(seed)
+        start = int(IPv4Address("10.0.0.1"))
+        self.entries: dict[str, tuple[str, int]] = {}
+        for index in range(size):
+            ip_address = str(IPv4Address(start + index))
+            lladdr = ":".join(f"{byte:02x}" for byte in (index + 1).to_bytes(6, "big"))
+            state = NUD_REACHABLE if rand.random() < reachable_ratio else NUD_STALE
+            self.entries[ip_address] = (lladdr, state)
+
+    def sample(self, count: int, seed: int = 0) -> list[str]:
+        """Return `count` addresses from the table."""
+        return random.Random(seed).sample(list(self.entries), count)
+
+    def ip_neigh_output(self) -> list[str]:
+        """Return the lines printed by `ip -4 neigh show nud reachable`."""
+        return [
+            f"{ip_address} dev eth0 lladdr {lladdr} REACHABLE"
+            for ip_address, (lladdr, state) in self.entries.items()
+            if state == NUD_REACHABLE
+        ]
+
+    def arp_output(self) -> list[str]:
+        """Return the lines printed by `arp -ne`."""
+        lines = ["Address                  HWtype  HWaddress           Flags Mask            Iface"]
+        for ip_address, (lladdr, _) in self.entries.items():
+            lines.append(f"{ip_address:<24} ether   {lladdr}   C                     eth0")
+        return lines
+
+    def proc_net_arp_output(self) -> str:
+        """Return the contents of /proc/net/arp."""
+        lines = ["IP address       HW type     Flags       HW address            Mask     Device"]
+        for ip_address, (lladdr, state) in self.entries.items():
+            flags = 0x2 if state == NUD_REACHABLE else 0x0
+            lines.append(f"{ip_address:<16} 0x1         {flags:#x}         {lladdr}     *        eth0")
+        return "\n".join(lines) + "\n"
+
+
+class FakeNeighbourMessage(dict):
+    """Neighbour message shaped like the ones pyroute2 returns."""
+
+    def __init__(self, ip_address: str, lladdr: str | None, state: int, event: str = "RTM_NEWNEIGH") -> None:
+        """Initialize the message, without a link layer address attribute when `lladdr` is None."""
+        attrs = [("NDA_DST", ip_address)]
+        if lladdr is not None:
+            attrs.append(("NDA_LLADDR", lladdr))
+        super().__init__(family=socket.AF_INET, ifindex=IFINDEX, state=state, event=event, attrs=attrs)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look up fields first, then attributes."""
+        if key in self:
+            return self[key]
+        return next((value for name, value in self["attrs"] if name == key), default)
+
+
+class FakeIPRoute:
+    """Stand-in for pyroute2.IPRoute backed by a NeighbourTable."""
+
+    table: NeighbourTable
+
+    def __init__(self, *_: Any, **__: Any) -> None:
+        """Open the fake socket."""
+        self.requests = 0
+
+    def close(self) -> None:
+        """Close the fake socket."""
+
+    def get_neighbours(self, family: int = socket.AF_UNSPEC, match: Callable | None = None) -> list:
+        """Dump the table, which has no IPv6 neighbours."""
+        self.requests += 1
+        if family == socket.AF_INET6:
+            return []
+        result = (FakeNeighbourMessage(ip, lladdr, state) for ip, (lladdr, state) in self.table.entries.items())
+        return [msg for msg in result if match is None or match(msg)]
+
+    def route(self, command: str, dst: str) -> list:
+        """Return a route through the only interface."""
+        self.requests += 1
+        return [{"RTA_OIF": IFINDEX}]
+
+    def neigh(self, command: str, dst: str, ifindex: int, **kwargs: Any) -> list:
+        """Return a single neighbour, revalidating is a no-op."""
+        self.requests += 1
+        if command != "get":
+            return []
+        if (entry := self.table.entries.get(dst)) is None:
+            raise NetlinkError(errno.ENOENT, "No such file or directory")
+        return [FakeNeighbourMessage(dst, *entry)]
+
+
+class FakeInterfaceMap(InterfaceMap):
+    """Interface map without attached networks, every address uses the default socket."""
+
+    async def async_refresh(self, hass: Any) -> bool:
+        """Keep the map empty."""
+        return False
+
+
+class FakeDatagramTransport(asyncio.DatagramTransport):
+    """Transport counting datagrams instead of sending them."""
+
+    def __init__(self) -> None:
+        """Initialize the transport."""
+        super().__init__()
+        self.sent = 0
+        self._closing = False
+
+    def sendto(self, data: bytes, addr: Any = None) -> None:
+        """Count a datagram."""
+        self.sent += 1
+
+    def is_closing(self) -> bool:
+        """Return if the transport is closed."""
+        return self._closing
+
+    def close(self) -> None:
+        """Close the transport."""
+        self._closing = True
+
+
+class FakeHass:
+    """Minimal stand-in for HomeAssistant, enough for the scanner module."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the fake."""
+        self.loop = loop
+        self.data: dict[str, Any] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def async_add_executor_job(self, target: Callable, *args: Any) -> asyncio.Future:
+        """Run a job in the executor."""
+        return self.loop.run_in_executor(self._executor, target, *args)
+
+    def async_create_task(self, target: Any, name: str | None = None) -> asyncio.Task:
+        """Create a task."""
+        return self.loop.create_task(target, name=name)
+
+    def async_create_background_task(self, target: Any, name: str) -> asyncio.Task:
+        """Create a task."""
+        return self.loop.create_task(target, name=name)
+
+    def close(self) -> None:
+        """Shut the executor down."""
+        self._executor.shutdown()
@@ -0,0 +1,556 @@
+"""Deterministic stand-in for the network layer, driven by a virtual clock.
+
+`VirtualClockLoop` is an event loop whose clock jumps to the next timer
+whenever there is nothing else to do, so hours of scanning run in seconds.
+
+`SimulatedNetwork` models a LAN and the kernel neighbour table of the host:
+devices come and go, drop packets and answer with their own latency, and
+neighbour entries move through the NUD states as probes and lookups use them.
+It plugs in where the scanner module reaches the network: `pyroute2.IPRoute`,
+`pyroute2.AsyncIPRoute`, `loop.create_datagram_endpoint` and
+`asyncio.create_subprocess_exec`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import random
+import selectors
+import socket
+import threading
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from ipaddress import IPv4Address
+from typing import Any, Callable, Sequence
+from unittest.mock import patch
+
+from homeassistant.helpers import event as event_helper
+from homeassistant.util import dt as dt_util
+from pyroute2.netlink.exceptions import NetlinkError
+
+from custom_components.iphonedetect.interfaces import InterfaceMap
+from custom_components.iphonedetect.scanner import NTF_USE, NUD_REACHABLE
+
+from .fakes import IFINDEX, FakeNeighbourMessage
+
+NUD_INCOMPLETE = 0x01
+NUD_STALE = 0x04
+NUD_DELAY = 0x08
+NUD_PROBE = 0x10
+NUD_FAILED = 0x20
+NUD_NAMES = {
+    NUD_INCOMPLETE: "INCOMPLETE",
+    NUD_REACHABLE: "REACHABLE",
+    NUD_STALE: "STALE",
+    NUD_DELAY: "DELAY",
+    NUD_PROBE: "PROBE",
+    NUD_FAILED: "FAILED",
+}
+# Neighbour states with a link layer address
+NUD_VALID = NUD_REACHABLE | NUD_STALE | NUD_DELAY | NUD_PROBE
+
+# Kernel defaults from /proc/sys/net/ipv4/neigh/default
+BASE_REACHABLE_TIME = 30
+DELAY_FIRST_PROBE_TIME = 5
+RETRANS_TIME = 1
+MCAST_SOLICIT = 3
+UCAST_SOLICIT = 3
+FAILED_GC_TIME = 60
+
+INTERFACE = "sim0"
+GATEWAY = ("10.0.0.1", "02:00:00:00:00:01")
+START_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Selector that advances the virtual clock instead of sleeping."""
+
+    loop: VirtualClockLoop
+
+    def select(self, timeout: float | None = None) -> list:
+        """Return ready events, moving the clock to the next timer when idle.
+
+        While executor jobs are running the clock stands still and the real
+        selector waits for them, so work done in threads takes no virtual time.
+        """
+        if (events := super().select(0)) or timeout == 0:
+            return events
+        if timeout is None or self.loop.executor_jobs:
+            return super().select()
+        self.loop.advance(timeout)
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop running on a virtual clock that starts at zero."""
+
+    def __init__(self, start: datetime = START_TIME) -> None:
+        """Initialize the loop."""
+        selector = VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self.start = start
+        self.executor_jobs = 0
+        self._now = 0.0
+
+    def time(self) -> float:
+        """Return the virtual monotonic time."""
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward."""
+        self._now += seconds
+
+    def timestamp(self) -> float:
+        """Return the virtual wall clock as a POSIX timestamp."""
+        return self.start.timestamp() + self._now
+
+    def utcnow(self) -> datetime:
+        """Return the virtual wall clock."""
+        return self.start + timedelta(seconds=self._now)
+
+    def run_in_executor(self, executor: Any, func: Callable, *args: Any) -> asyncio.Future:
+        """Run a job in the executor, holding the clock until it is done."""
+        future = super().run_in_executor(executor, func, *args)
+        self.executor_jobs += 1
+        future.add_done_callback(self._executor_job_done)
+        return future
+
+    def _executor_job_done(self, _: asyncio.Future) -> None:
+        """Release the clock once no job is left."""
+        self.executor_jobs -= 1
+
+    def patch_clock(self) -> ExitStack:
+        """Return a context manager making Home Assistant read the virtual clock."""
+        stack = ExitStack()
+        stack.enter_context(patch("time.time", self.timestamp))
+        stack.enter_context(patch.object(dt_util, "utcnow", self.utcnow))
+        # The event helper keeps its own references to the clock
+        for name, clock in (("time_tracker_utcnow", self.utcnow), ("time_tracker_timestamp", self.timestamp)):
+            if hasattr(event_helper, name):
+                stack.enter_context(patch.object(event_helper, name, clock))
+        return stack
+
+
+@dataclass(slots=True, kw_only=True)
+class SimDevice:
+    """A device on the simulated LAN."""
+
+    ip_address: str
+    mac_address: str
+    rand: random.Random
+    latency: float
+    mdns: bool = True
+    present: bool = True
+    changes: list[tuple[float, bool]] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Neighbour:
+    """A kernel neighbour table entry."""
+
+    state: int
+    lladdr: str | None = None
+    solicits: int = 0
+    timer: asyncio.TimerHandle | None = None
+    queue: list[Callable[[], None]] = field(default_factory=list)
+
+
+class SimulatedNetwork:
+    """A LAN of devices seen through a simulated kernel neighbour table.
+
+    Sending to an address uses its neighbour entry like the kernel does: a
+    missing or failed entry is resolved with up to MCAST_SOLICIT requests, a
+    stale one is reprobed after DELAY_FIRST_PROBE_TIME, and reachable entries
+    go stale after a randomized BASE_REACHABLE_TIME. Datagrams wait in the
+    entry queue until it is resolved. Every request and reply is dropped with
+    probability `loss`, and devices answer after their own `latency`.
+
+    Each device draws from its own generator seeded from `seed` and its
+    address, and all timers run on the loop, so a run on a VirtualClockLoop is
+    reproducible whatever order the devices are probed in.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        loss: float = 0,
+        command_latency: float = 0,
+        seed: int = 0,
+    ) -> None:
+        """Initialize an empty network."""
+        self.loop = loop
+        self.loss = loss
+        self.command_latency = command_latency
+        self.seed = seed
+        self.devices: dict[str, SimDevice] = {}
+        self.table: dict[str, Neighbour] = {}
+        self.counters: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[str, str | None, int, bool], None]] = []
+        # The host talks to the gateway all the time, its entry never goes stale
+        self.table[GATEWAY[0]] = Neighbour(NUD_REACHABLE, GATEWAY[1])
+
+    def add_devices(
+        self,
+        count: int,
+        *,
+        latency: tuple[float, float] = (0.005, 0.05),
+        mdns_ratio: float = 1,
+        first_address: str = "10.0.1.1",
+    ) -> list[SimDevice]:
+        """Add `count` present devices with consecutive addresses and a random latency each."""
+        start = int(IPv4Address(first_address))
+        added = []
+        for index in range(count):
+            ip_address = str(IPv4Address(start + index))
+            rand = random.Random(f"{self.seed}:{ip_address}")
+            device = self.devices[ip_address] = SimDevice(
+                ip_address=ip_address,
+                mac_address="02:" + ":".join(f"{byte:02x}" for byte in (len(self.devices) + 2).to_bytes(5, "big")),
+                rand=rand,
+                latency=rand.uniform(*latency),
+                mdns=rand.random() < mdns_ratio,
+            )
+            added.append(device)
+        return added
+
+    def schedule_presence(self, devices: Sequence[SimDevice], mean_home: float, mean_away: float) -> None:
+        """Let `devices` come and go, staying for exponentially distributed times."""
+        for device in devices:
+            device.present = device.rand.random() < mean_home / (mean_home + mean_away)
+            device.changes.append((self.loop.time(), device.present))
+            self._schedule_toggle(device, mean_home, mean_away)
+
+    def _schedule_toggle(self, device: SimDevice, mean_home: float, mean_away: float) -> None:
+        """Schedule the next arrival or departure of `device`."""
+        delay = device.rand.expovariate(1 / (mean_home if device.present else mean_away))
+        self.loop.call_later(delay, self._toggle, device, mean_home, mean_away)
+
+    def _toggle(self, device: SimDevice, mean_home: float, mean_away: float) -> None:
+        """Move `device` in or out of the network."""
+        device.present = not device.present
+        device.changes.append((self.loop.time(), device.present))
+        self.counters["arrivals" if device.present else "departures"] += 1
+        self._schedule_toggle(device, mean_home, mean_away)
+
+    def _answers(self, device: SimDevice | None) -> bool:
+        """Return if `device` receives a packet and its answer makes it back."""
+        return device is not None and device.present and device.rand.random() >= self.loss
+
+    # Neighbour table
+
+    def _set_state(self, ip_address: str, entry: Neighbour, state: int) -> None:
+        """Move an entry to `state` and tell the listeners."""
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+        with self._lock:
+            entry.state = state
+            self.table[ip_address] = entry
+        self._notify(ip_address, entry.lladdr, state, False)
+
+    def _delete(self, ip_address: str) -> None:
+        """Garbage collect a failed entry."""
+        with self._lock:
+            entry = self.table.pop(ip_address, None)
+        if entry is not None:
+            self._notify(ip_address, entry.lladdr, entry.state, True)
+
+    def use(self, ip_address: str, send: Callable[[], None] | None = None) -> None:
+        """Use the neighbour entry of `ip_address`, sending through it once resolved."""
+        entry = self.table.get(ip_address)
+        if entry is None or entry.state == NUD_FAILED:
+            entry = entry or Neighbour(NUD_INCOMPLETE)
+            entry.solicits = 0
+            self._set_state(ip_address, entry, NUD_INCOMPLETE)
+            self._solicit(ip_address, entry)
+        elif entry.state == NUD_STALE:
+            self._set_state(ip_address, entry, NUD_DELAY)
+            entry.timer = self.loop.call_later(DELAY_FIRST_PROBE_TIME, self._probe, ip_address, entry)
+
+        if send is None:
+            return
+        if entry.state & NUD_VALID:
+            send()
+        else:
+            entry.queue.append(send)
+
+    def _probe(self, ip_address: str, entry: Neighbour) -> None:
+        """Start confirming a delayed entry with unicast requests."""
+        entry.solicits = 0
+        self._set_state(ip_address, entry, NUD_PROBE)
+        self._solicit(ip_address, entry)
+
+    def _solicit(self, ip_address: str, entry: Neighbour) -> None:
+        """Send one ARP request, the entry fails after too many unanswered."""
+        limit = MCAST_SOLICIT if entry.state == NUD_INCOMPLETE else UCAST_SOLICIT
+        if entry.solicits >= limit:
+            entry.queue.clear()
+            entry.lladdr = None
+            self._set_state(ip_address, entry, NUD_FAILED)
+            entry.timer = self.loop.call_later(FAILED_GC_TIME, self._delete, ip_address)
+            return
+
+        entry.solicits += 1
+        self.counters["arp_requests"] += 1
+        device = self.devices.get(ip_address)
+        if self._answers(device):
+            entry.timer = self.loop.call_later(device.latency, self._confirm, ip_address, entry, device)
+        else:
+            entry.timer = self.loop.call_later(RETRANS_TIME, self._solicit, ip_address, entry)
+
+    def _confirm(self, ip_address: str, entry: Neighbour, device: SimDevice) -> None:
+        """Mark an entry reachable on an ARP reply and send what waited for it."""
+        entry.lladdr = device.mac_address
+        entry.solicits = 0
+        self._set_state(ip_address, entry, NUD_REACHABLE)
+        reachable_time = BASE_REACHABLE_TIME * device.rand.uniform(0.5, 1.5)
+        entry.timer = self.loop.call_later(reachable_time, self._set_state, ip_address, entry, NUD_STALE)
+        queue, entry.queue = entry.queue, []
+        for send in queue:
+            send()
+
+    def _notify(self, ip_address: str, lladdr: str | None, state: int, deleted: bool) -> None:
+        """Pass a neighbour change to the listeners."""
+        self.counters["neighbour_events"] += 1
+        for listener in self._listeners:
+            listener(ip_address, lladdr, state, deleted)
+
+    def listen(self, listener: Callable[[str, str | None, int, bool], None]) -> Callable[[], None]:
+        """Call `listener` on every neighbour change, return a function removing it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def snapshot(self) -> list[tuple[str, str | None, int]]:
+        """Return the neighbour table, safe to call from any thread."""
+        with self._lock:
+            return [(ip_address, entry.lladdr, entry.state) for ip_address, entry in self.table.items()]
+
+    # Datagrams
+
+    def send_datagram(self, transport: SimDatagramTransport, data: bytes, ip_address: str) -> None:
+        """Deliver a probe, devices owning the address answer mDNS queries."""
+        self.counters["datagrams"] += 1
+
+        def _send() -> None:
+            device = self.devices.get(ip_address)
+            if device is not None and device.mdns and self._answers(device):
+                # Echo the question with the QR bit set
+                reply = data[:2] + bytes([data[2] | 0x80]) + data[3:]
+                self.loop.call_later(2 * device.latency, transport.receive, reply, (ip_address, 5353))
+
+        self.use(ip_address, _send)
+
+    async def create_datagram_endpoint(
+        self, protocol_factory: Callable[[], asyncio.DatagramProtocol], *_: Any, sock: Any = None, **__: Any
+    ) -> tuple[SimDatagramTransport, asyncio.DatagramProtocol]:
+        """Stand-in for loop.create_datagram_endpoint."""
+        if sock is not None:
+            sock.close()
+        protocol = protocol_factory()
+        transport = SimDatagramTransport(self, protocol)
+        protocol.connection_made(transport)
+        return transport, protocol
+
+    # Commands
+
+    def ip_neigh_line(self, ip_address: str, lladdr: str | None, state: int) -> str:
+        """Return the line `ip neigh` prints for an entry."""
+        address = f" lladdr {lladdr}" if lladdr is not None else ""
+        return f"{ip_address} dev {INTERFACE}{address} {NUD_NAMES[state]}"
+
+    def run_command(self, argv: Sequence[str]) -> list[str]:
+        """Return the output of `ip -4 neigh show` or `arp -ne`, `ip -6 neigh show` prints nothing."""
+        if argv[:2] == ["ip", "-6"]:
+            return []
+        entries = self.snapshot()
+        if argv[:4] == ["ip", "-4", "neigh", "show"]:
+            states = NUD_REACHABLE if "nud" in argv else ~0
+            return [self.ip_neigh_line(*entry) for entry in entries if entry[2] & states]
+        if argv[:2] == ["arp", "-ne"]:
+            lines = ["Address                  HWtype  HWaddress           Flags Mask            Iface"]
+            for ip_address, lladdr, state in entries:
+                if state & NUD_VALID:
+                    lines.append(f"{ip_address:<24} ether   {lladdr}   C                     {INTERFACE}")
+                elif state == NUD_INCOMPLETE:
+                    lines.append(f"{ip_address:<24}         (incomplete)                              {INTERFACE}")
+            return lines
+        raise FileNotFoundError(errno.ENOENT, "No such file or directory", argv[0])
+
+    async def create_subprocess_exec(self, program: str, *args: str, **_: Any) -> SimProcess:
+        """Stand-in for asyncio.create_subprocess_exec."""
+        argv = [program, *args]
+        self.counters["commands"] += 1
+        if argv == ["ip", "monitor", "neigh"]:
+            return SimProcess(self, monitor=True)
+        return SimProcess(self, output=self.run_command(argv))
+
+    # Patching
+
+    def patch(self) -> ExitStack:
+        """Return a context manager routing the scanner module through this network."""
+        network = self
+
+        class _IPRoute(SimIPRoute):
+            def __init__(self, *_: Any, **__: Any) -> None:
+                super().__init__(network)
+
+        class _AsyncIPRoute(SimAsyncIPRoute):
+            def __init__(self, *_: Any, **__: Any) -> None:
+                super().__init__(network)
+
+        stack = ExitStack()
+        stack.enter_context(patch("pyroute2.IPRoute", _IPRoute))
+        stack.enter_context(patch("pyroute2.AsyncIPRoute", _AsyncIPRoute))
+        stack.enter_context(patch("asyncio.create_subprocess_exec", self.create_subprocess_exec))
+        stack.enter_context(patch.object(self.loop, "create_datagram_endpoint", self.create_datagram_endpoint))
+        # No host adapter holds the simulated LAN, every probe uses the default socket
+        stack.enter_context(patch.object(InterfaceMap, "_get_networks", staticmethod(lambda: [])))
+        return stack
+
+
+class SimDatagramTransport(asyncio.DatagramTransport):
+    """Probe transport of the simulated network."""
+
+    def __init__(self, network: SimulatedNetwork, protocol: asyncio.DatagramProtocol) -> None:
+        """Initialize the transport."""
+        super().__init__()
+        self._network = network
+        self._protocol = protocol
+        self._closing = False
+
+    def sendto(self, data: bytes, addr: Any = None) -> None:
+        """Send a datagram."""
+        if not self._closing:
+            self._network.send_datagram(self, data, addr[0])
+
+    def receive(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Hand a reply to the protocol."""
+        if not self._closing:
+            self._network.counters["datagram_replies"] += 1
+            self._protocol.datagram_received(data, addr)
+
+    def is_closing(self) -> bool:
+        """Return if the transport is closed."""
+        return self._closing
+
+    def close(self) -> None:
+        """Close the transport."""
+        if not self._closing:
+            self._closing = True
+            self._network.loop.call_soon(self._protocol.connection_lost, None)
+
+
+class SimIPRoute:
+    """Stand-in for pyroute2.IPRoute, called from executor threads."""
+
+    def __init__(self, network: SimulatedNetwork) -> None:
+        """Open the simulated netlink socket."""
+        self._network = network
+
+    def close(self) -> None:
+        """Close the simulated netlink socket."""
+
+    def get_neighbours(self, family: int = 0, match: Callable | None = None) -> list:
+        """Dump the neighbour table, which has no IPv6 neighbours."""
+        self._network.counters["netlink_requests"] += 1
+        if family == socket.AF_INET6:
+            return []
+        result = (FakeNeighbourMessage(*entry) for entry in self._network.snapshot())
+        return [msg for msg in result if match is None or match(msg)]
+
+    def route(self, command: str, dst: str) -> list:
+        """Return a route through the only interface."""
+        self._network.counters["netlink_requests"] += 1
+        return [{"RTA_OIF": IFINDEX}]
+
+    def neigh(self, command: str, dst: str, ifindex: int, flags: int = 0, **_: Any) -> list:
+        """Look up a neighbour, or use it with NTF_USE."""
+        network = self._network
+        network.counters["netlink_requests"] += 1
+        if command != "get":
+            if flags & NTF_USE:
+                # The table is only changed on the loop
+                network.loop.call_soon_threadsafe(network.use, dst)
+            return []
+
+        with network._lock:
+            entry = network.table.get(dst)
+            if entry is None:
+                raise NetlinkError(errno.ENOENT, "No such file or directory")
+            return [FakeNeighbourMessage(dst, entry.lladdr, entry.state)]
+
+
+class SimAsyncIPRoute:
+    """Stand-in for pyroute2.AsyncIPRoute, receiving neighbour events."""
+
+    def __init__(self, network: SimulatedNetwork) -> None:
+        """Open the simulated netlink socket."""
+        self._network = network
+        self._queue: asyncio.Queue[FakeNeighbourMessage] = asyncio.Queue()
+        self._unsub: Callable[[], None] | None = None
+
+    async def __aenter__(self) -> SimAsyncIPRoute:
+        """Enter the context."""
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        """Stop receiving events."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    async def bind(self, groups: int = 0) -> None:
+        """Subscribe to neighbour events."""
+        self._unsub = self._network.listen(self._queue_event)
+
+    def _queue_event(self, ip_address: str, lladdr: str | None, state: int, deleted: bool) -> None:
+        """Queue a neighbour change as a netlink message."""
+        event = "RTM_DELNEIGH" if deleted else "RTM_NEWNEIGH"
+        self._queue.put_nowait(FakeNeighbourMessage(ip_address, lladdr, state, event))
+
+    async def get(self):
+        """Yield the messages of the next receive."""
+        yield await self._queue.get()
+        while not self._queue.empty():
+            yield self._queue.get_nowait()
+
+
+class SimProcess:
+    """Stand-in for asyncio.subprocess.Process running a neighbour command."""
+
+    def __init__(self, network: SimulatedNetwork, output: list[str] | None = None, monitor: bool = False) -> None:
+        """Start the process, a monitor prints neighbour changes until killed."""
+        self._network = network
+        self._output = output or []
+        self.returncode: int | None = None
+        self.stdout = asyncio.StreamReader()
+        self._unsub = network.listen(self._print_event) if monitor else None
+
+    def _print_event(self, ip_address: str, lladdr: str | None, state: int, deleted: bool) -> None:
+        """Print a neighbour change like `ip monitor neigh`."""
+        line = self._network.ip_neigh_line(ip_address, lladdr, state)
+        self.stdout.feed_data(f"{'Deleted ' if deleted else ''}{line}\n".encode())
+
+    async def communicate(self) -> tuple[bytes, None]:
+        """Return the output after the command latency."""
+        await asyncio.sleep(self._network.command_latency)
+        self.returncode = 0
+        return "".join(f"{line}\n" for line in self._output).encode(), None
+
+    def kill(self) -> None:
+        """Stop the process."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self.stdout.feed_eof()
+        self.returncode = -9
+
+    async def wait(self) -> int | None:
+        """Return the exit code."""
+        return self.returncode
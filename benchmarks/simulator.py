@@ -0,0 +1,294 @@
+"""Run the integration end to end against a simulated network.
+
+Config entries are imported and set up through Home Assistant, and scanned by
+the coordinator into device tracker entities, while every device sits on a
+SimulatedNetwork and time runs on a VirtualClockLoop. Run from the repository
+root with Home Assistant installed:
+
+    python -m benchmarks.simulator --devices 100 1000 --duration 3600
+
+Each run reports the scan cost, the network traffic, and how fast and how
+faithfully the entities followed the devices coming and going.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from dataclasses import dataclass, field
+from unittest.mock import patch
+
+from homeassistant import bootstrap, loader
+from homeassistant.components.device_tracker import CONF_CONSIDER_HOME
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntries
+from homeassistant.const import CONF_IP_ADDRESS, CONF_NAME, EVENT_STATE_CHANGED, STATE_HOME, STATE_NOT_HOME
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.setup import async_setup_component
+
+from custom_components.iphonedetect import scanner as scanner_module
+from custom_components.iphonedetect.const import (
+    CONF_PROBE_BACKOFF,
+    CONF_PROBE_BUDGET,
+    CONF_PROBE_BURST,
+    DEFAULT_CONSIDER_HOME,
+    DEFAULT_PROBE_BACKOFF,
+    DEFAULT_PROBE_BUDGET,
+    DEFAULT_PROBE_BURST,
+    DOMAIN,
+)
+from custom_components.iphonedetect.stats import ScanStats, percentiles
+
+from .network import SimDevice, SimulatedNetwork, VirtualClockLoop
+
+SIMULATED_SCANNERS = ("ip_route", "ip_neigh", "arp")
+
+
+@dataclass(slots=True)
+class Results:
+    """Outcome of one simulated run, times in virtual seconds."""
+
+    arrivals: int = 0
+    departures: int = 0
+    arrival_latency: list[float] = field(default_factory=list)
+    departure_latency: list[float] = field(default_factory=list)
+    false_not_home: int = 0
+    false_home: int = 0
+    wrong_time: float = 0
+    total_time: float = 0
+
+
+def evaluate(
+    results: Results,
+    truth: list[tuple[float, bool]],
+    states: list[tuple[float, str]],
+    start: float,
+    end: float,
+) -> None:
+    """Compare the entity states of a device with when it was present, from `start` to `end`.
+
+    An arrival or departure counts once the entity state differs from it, and
+    is followed when the entity catches up before the next one. Entity changes
+    away from the truth are flaps.
+    """
+    events = sorted([(at, False, present) for at, present in truth] + [(at, True, state) for at, state in states])
+    present: bool | None = None
+    home: bool | None = None
+    # When the device last arrived or left, while the entity has not followed
+    pending: float | None = None
+    last = start
+
+    for at, is_state, value in events:
+        if at > end:
+            break
+        if at > start:
+            if home is None or home != present:
+                results.wrong_time += at - last
+            last = at
+
+        if not is_state:
+            present = value
+            pending = at if home != present else None
+            if pending is not None and at >= start:
+                if present:
+                    results.arrivals += 1
+                else:
+                    results.departures += 1
+            continue
+
+        home = value == STATE_HOME if value in (STATE_HOME, STATE_NOT_HOME) else None
+        if home is None or present is None or at < start:
+            continue
+        if home == present:
+            if pending is not None and pending >= start:
+                (results.arrival_latency if present else results.departure_latency).append(at - pending)
+            pending = None
+        elif pending is None:
+            if home:
+                results.false_home += 1
+            else:
+                results.false_not_home += 1
+
+    if home is None or home != present:
+        results.wrong_time += end - last
+    results.total_time += end - start
+
+
+async def async_setup_hass(config_dir: str, budget: float, burst: int, backoff: float) -> HomeAssistant:
+    """Return Home Assistant with the integration set up and no entries yet."""
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    # Created before the base functionality is loaded, as in bootstrap.async_from_config_dict
+    hass.config_entries = ConfigEntries(hass, {})
+    if (load := getattr(bootstrap, "async_load_base_functionality", None)) is not None:
+        # Initializes the config entries too
+        await load(hass)
+    else:
+        # Home Assistant before 2024.2
+        await bootstrap.load_registries(hass)
+        await hass.config_entries.async_initialize()
+    # Mark the web server as loaded, the simulation has no frontend
+    hass.config.components.update({"http", "websocket_api"})
+    config = {CONF_PROBE_BUDGET: budget, CONF_PROBE_BURST: burst, CONF_PROBE_BACKOFF: backoff}
+    await async_setup_component(hass, DOMAIN, {DOMAIN: config})
+    return hass
+
+
+async def async_import_devices(hass: HomeAssistant, devices: list[SimDevice], consider_home: int) -> None:
+    """Create a config entry per device, skipping the subnet check of the host adapters."""
+    await asyncio.gather(
+        *(
+            hass.config_entries.flow.async_init(
+                DOMAIN,
+                context={"source": SOURCE_IMPORT},
+                data={
+                    CONF_NAME: f"Phone {index}",
+                    CONF_IP_ADDRESS: device.ip_address,
+                    CONF_CONSIDER_HOME: consider_home,
+                    "subnet_check": False,
+                },
+            )
+            for index, device in enumerate(devices)
+        )
+    )
+    await hass.async_block_till_done()
+
+
+async def simulate(args: argparse.Namespace, count: int) -> None:
+    """Run one simulation of `count` devices and print the results."""
+    loop = asyncio.get_running_loop()
+    network = SimulatedNetwork(loop, loss=args.loss, command_latency=args.command_latency, seed=args.seed)
+    devices = network.add_devices(count, latency=tuple(args.latency), mdns_ratio=args.mdns_ratio)
+    network.schedule_presence(devices, args.mean_home, args.mean_away)
+
+    states: dict[str, list[tuple[float, str]]] = {}
+
+    @callback
+    def _state_changed(event: Event) -> None:
+        """Record device tracker states on the virtual clock, by name."""
+        if event.data["entity_id"].startswith("device_tracker.") and (new_state := event.data["new_state"]):
+            states.setdefault(new_state.name, []).append((loop.time(), new_state.state))
+
+    with (
+        tempfile.TemporaryDirectory() as config_dir,
+        network.patch(),
+        patch.dict(scanner_module.SCANNERS, {args.scanner: scanner_module.SCANNERS[args.scanner]}, clear=True),
+    ):
+        wall = time.perf_counter()
+        hass = await async_setup_hass(config_dir, args.budget, args.burst, args.backoff)
+        hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+        await async_import_devices(hass, devices, args.consider_home)
+        setup_wall = time.perf_counter() - wall
+        start = loop.time()
+
+        wall = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        run_wall = time.perf_counter() - wall
+        end = loop.time()
+
+        results = Results()
+        tracked = 0
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            # Entities are named after their entry
+            if entry.title not in states:
+                continue
+            tracked += 1
+            device = network.devices[entry.options[CONF_IP_ADDRESS]]
+            evaluate(results, device.changes, states[entry.title], start + args.warmup, end)
+
+        stats: ScanStats = hass.data[DOMAIN]["scan_stats"]
+        scanner_name = type(hass.data[DOMAIN]["scanner"]).__name__
+        report(args, count, tracked, scanner_name, stats, network, results, setup_wall, run_wall)
+        await hass.async_stop(force=True)
+
+
+def _format_percentiles(values: list[float], unit: str = "s", scale: float = 1) -> str:
+    """Return percentiles as a compact string."""
+    return " ".join(f"{name}={value * scale:.2f}{unit}" for name, value in percentiles(values).items()) or "-"
+
+
+def report(
+    args: argparse.Namespace,
+    count: int,
+    tracked: int,
+    scanner_name: str,
+    stats: ScanStats,
+    network: SimulatedNetwork,
+    results: Results,
+    setup_wall: float,
+    run_wall: float,
+) -> None:
+    """Print the results of one run."""
+    counters = network.counters
+    fetch_times = [sample.fetch_time for sample in stats.samples]
+    probes = [sample.probes for sample in stats.samples]
+    accuracy = 1 - results.wrong_time / results.total_time if results.total_time else 0
+
+    print(f"== {count} devices, {tracked} entities, {args.duration:.0f}s simulated with {scanner_name}")
+    print(f"wall time: setup {setup_wall:.2f}s, run {run_wall:.2f}s ({args.duration / run_wall:.0f}x real time)")
+    print(
+        f"scans: {stats.cycles} cycles, {stats.overruns} overruns, {stats.skipped} skipped, "
+        f"{run_wall / max(stats.cycles, 1) * 1000:.2f}ms wall per cycle, max {stats.max_duration:.2f}s simulated"
+    )
+    print(f"probes per cycle: {_format_percentiles(probes, '')}, fetch: {_format_percentiles(fetch_times, 'ms', 1000)}")
+    print(
+        f"network: {counters['datagrams']} datagrams, {counters['datagram_replies']} replies, "
+        f"{counters['arp_requests']} ARP requests, {counters['netlink_requests']} netlink requests, "
+        f"{counters['commands']} commands, {counters['neighbour_events']} neighbour events"
+    )
+    print(
+        f"arrivals: {len(results.arrival_latency)}/{results.arrivals} followed, "
+        f"{_format_percentiles(results.arrival_latency)}"
+    )
+    print(
+        f"departures: {len(results.departure_latency)}/{results.departures} followed, "
+        f"{_format_percentiles(results.departure_latency)}"
+    )
+    print(
+        f"flaps: {results.false_not_home} not_home while present, {results.false_home} home while away, "
+        f"states right {accuracy:.2%} of the time"
+    )
+
+
+def run(args: argparse.Namespace) -> None:
+    """Run a simulation per device count, each on a fresh loop."""
+    for count in args.devices:
+        loop = VirtualClockLoop()
+        try:
+            with loop.patch_clock():
+                loop.run_until_complete(simulate(args, count))
+        finally:
+            loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[100], help="numbers of tracked devices")
+    parser.add_argument("--duration", type=float, default=3600, help="simulated seconds")
+    parser.add_argument("--warmup", type=float, default=60, help="simulated seconds left out of the results")
+    parser.add_argument("--scanner", choices=SIMULATED_SCANNERS, default="ip_route", help="scanner to use")
+    parser.add_argument("--budget", type=float, default=DEFAULT_PROBE_BUDGET, help="probe_budget, probes per second")
+    parser.add_argument("--burst", type=int, default=DEFAULT_PROBE_BURST, help="probe_burst, probes sent at once")
+    parser.add_argument(
+        "--backoff", type=float, default=DEFAULT_PROBE_BACKOFF, help="probe_backoff, seconds between probes when away"
+    )
+    parser.add_argument("--consider-home", type=int, default=DEFAULT_CONSIDER_HOME, help="consider_home in seconds")
+    parser.add_argument("--loss", type=float, default=0.05, help="probability a packet is lost")
+    parser.add_argument(
+        "--latency", type=float, nargs=2, default=[0.005, 0.2], metavar=("MIN", "MAX"), help="device latency"
+    )
+    parser.add_argument("--command-latency", type=float, default=0.02, help="run time of neighbour commands")
+    parser.add_argument("--mdns-ratio", type=float, default=0.8, help="share of devices answering mDNS")
+    parser.add_argument("--mean-home", type=float, default=1800, help="mean seconds a device stays")
+    parser.add_argument("--mean-away", type=float, default=600, help="mean seconds a device is away")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the simulated network")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log the integration at debug level")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.verbose:
+        logging.getLogger("custom_components.iphonedetect").setLevel(logging.DEBUG)
+    run(args)
@@ -2,64 +2,180 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import timedelta
 from typing import TYPE_CHECKING, Any
 
+import voluptuous as vol
 from homeassistant.components.device_tracker import CONF_CONSIDER_HOME
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_DEVICES, CONF_IP_ADDRESS, Platform
+from homeassistant.const import CONF_DEVICES, CONF_HOST, CONF_IP_ADDRESS, CONF_PORT, Platform
+from homeassistant.core import callback
 from homeassistant.exceptions import PlatformNotReady
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.event import async_track_time_interval
 
-from .const import DOMAIN, PROBE_INTERVAL
+from .const import (
+    CONF_AGENT,
+    CONF_AUTO_CONSIDER_HOME,
+    CONF_PROBE_BACKOFF,
+    CONF_PROBE_BUDGET,
+    CONF_PROBE_BURST,
+    CONF_TRACK_MAC,
+    DEFAULT_AGENT_PORT,
+    DEFAULT_PROBE_BACKOFF,
+    DEFAULT_PROBE_BUDGET,
+    DEFAULT_PROBE_BURST,
+    DOMAIN,
+    HISTORY_APPLY_INTERVAL,
+    PROBE_INTERVAL,
+    SETUP_SCAN_DELAY,
+    SIGNAL_SCAN_STATS,
+)
 from .coordinator import IphoneDetectUpdateCoordinator
+from .history import GapHistory
 from .scanner import (
     DeviceData,
-    Scanner,
+    Pinger,
+    PushScanner,
     ScannerException,
+    ScannerRemote,
     async_get_scanner,
     async_update_devices,
 )
+from .scheduler import ProbeScheduler
+from .services import async_setup_services
+from .snapshot import ReachabilitySnapshot
+from .stats import ScanStats
+from .validation import async_invalidate_entry_index
 
 if TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.typing import ConfigType
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.DEVICE_TRACKER]
+PLATFORMS = [Platform.DEVICE_TRACKER, Platform.SENSOR]
 TRACKER_INTERVAL = timedelta(seconds=PROBE_INTERVAL)
-DATA_COORDINATORS = "coordinators"
+HISTORY_INTERVAL = timedelta(seconds=HISTORY_APPLY_INTERVAL)
+DATA_CONFIG = "config"
+DATA_COORDINATOR = "coordinator"
+DATA_FIRST_SCAN = "first_scan"
+DATA_HISTORY = "history"
+DATA_PINGER = "pinger"
+DATA_SCAN_LOCK = "scan_lock"
+DATA_SCAN_STATS = "scan_stats"
 DATA_SCANNER = "scanner"
+DATA_SCHEDULER = "scheduler"
+DATA_SETUP_LOCK = "setup_lock"
+DATA_SNAPSHOT = "snapshot"
+DATA_STATS_ENTRY = "stats_entry"
+DATA_UNSUB_HISTORY = "unsub_history"
 DATA_UNSUB_UPDATE = "unsub_update"
 
+CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Optional(DOMAIN): vol.Schema(
+            {
+                vol.Optional(CONF_PROBE_BUDGET, default=DEFAULT_PROBE_BUDGET): vol.All(
+                    vol.Coerce(float), vol.Range(min=1)
+                ),
+                vol.Optional(CONF_PROBE_BURST, default=DEFAULT_PROBE_BURST): vol.All(
+                    vol.Coerce(int), vol.Range(min=1)
+                ),
+                vol.Optional(CONF_PROBE_BACKOFF, default=DEFAULT_PROBE_BACKOFF): vol.All(
+                    vol.Coerce(float), vol.Range(min=PROBE_INTERVAL)
+                ),
+                vol.Optional(CONF_AGENT): vol.Schema(
+                    {
+                        vol.Required(CONF_HOST): str,
+                        vol.Optional(CONF_PORT, default=DEFAULT_AGENT_PORT): vol.All(
+                            vol.Coerce(int), vol.Range(min=1, max=65535)
+                        ),
+                    }
+                ),
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up integration wide settings."""
+    data: dict[str, Any] = hass.data.setdefault(DOMAIN, {})
+    data[DATA_CONFIG] = config.get(DOMAIN) or CONFIG_SCHEMA({DOMAIN: {}})[DOMAIN]
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up config entries."""
     data: dict[str, Any] = hass.data.setdefault(DOMAIN, {})
     devices: dict[str, DeviceData] = data.setdefault(CONF_DEVICES, {})
-    coordinators: dict[str, IphoneDetectUpdateCoordinator] = data.setdefault(DATA_COORDINATORS, {})
 
-    scanner: Scanner | None = data.get(DATA_SCANNER)
-    if scanner is None:
-        try:
-            scanner = await async_get_scanner(hass)
-        except ScannerException as error:
-            raise PlatformNotReady(error) from error
-        data[DATA_SCANNER] = scanner
-    assert scanner is not None
-
-    if data.get(DATA_UNSUB_UPDATE) is None:
-        async def _update_devices(*_) -> None:
-            """Update reachability for all tracked devices."""
-            await async_update_devices(hass, scanner, devices)
-
-        data[DATA_UNSUB_UPDATE] = async_track_time_interval(
-            hass,
-            _update_devices,
-            TRACKER_INTERVAL,
-            cancel_on_shutdown=True,
-        )
+    # Entries are set up concurrently, only the first one creates the shared objects
+    async with data.setdefault(DATA_SETUP_LOCK, asyncio.Lock()):
+        if (scanner := data.get(DATA_SCANNER)) is None:
+            if (agent := data[DATA_CONFIG].get(CONF_AGENT)) is not None:
+                # The neighbour table of this host is not used, devices are seen by the agent
+                scanner = ScannerRemote(agent[CONF_HOST], agent[CONF_PORT])
+            else:
+                try:
+                    scanner = await async_get_scanner(hass)
+                except ScannerException as error:
+                    raise PlatformNotReady(error) from error
+            data[DATA_SCANNER] = scanner
+
+        if DATA_SNAPSHOT not in data:
+            # Loaded once, kept across reloads of the entries
+            snapshot = ReachabilitySnapshot(hass, devices)
+            await snapshot.async_load()
+            data[DATA_SNAPSHOT] = snapshot
+
+        data.setdefault(DATA_PINGER, Pinger())
+        data.setdefault(DATA_SCAN_LOCK, asyncio.Lock())
+        data.setdefault(DATA_SCAN_STATS, ScanStats())
+        # The scan statistics sensors belong to a single entry
+        data.setdefault(DATA_STATS_ENTRY, entry.entry_id)
+
+        if DATA_SCHEDULER not in data:
+            config = data[DATA_CONFIG]
+            data[DATA_SCHEDULER] = ProbeScheduler(
+                config[CONF_PROBE_BUDGET], burst=config[CONF_PROBE_BURST], backoff=config[CONF_PROBE_BACKOFF]
+            )
+
+        if DATA_COORDINATOR not in data:
+            coordinator = data[DATA_COORDINATOR] = IphoneDetectUpdateCoordinator(hass, devices)
+
+            if isinstance(scanner, PushScanner):
+                await scanner.async_start(hass, devices, coordinator.async_update_device)
+
+        if DATA_UNSUB_UPDATE not in data:
+            async def _update_devices(*_) -> None:
+                """Update reachability for all tracked devices."""
+                await async_scan(hass)
+
+            data[DATA_UNSUB_UPDATE] = async_track_time_interval(
+                hass,
+                _update_devices,
+                TRACKER_INTERVAL,
+                cancel_on_shutdown=True,
+            )
+
+        if DATA_UNSUB_HISTORY not in data:
+            @callback
+            def _apply_consider_home(*_) -> None:
+                """Apply the suggested consider_home where enabled."""
+                async_apply_consider_home(hass)
+
+            data[DATA_UNSUB_HISTORY] = async_track_time_interval(
+                hass,
+                _apply_consider_home,
+                HISTORY_INTERVAL,
+                cancel_on_shutdown=True,
+            )
 
     _LOGGER.debug("Adding '%s' to tracked devices", entry.options[CONF_IP_ADDRESS])
 
@@ -67,13 +183,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         ip_address=entry.options[CONF_IP_ADDRESS],
         consider_home=timedelta(seconds=entry.options[CONF_CONSIDER_HOME]),
         title=entry.title,
+        track_mac=entry.options.get(CONF_TRACK_MAC, False),
+        # History is kept across reloads of the entry
+        _history=data.setdefault(DATA_HISTORY, {}).setdefault(entry.entry_id, GapHistory()),
     )
+    data[DATA_SNAPSHOT].restore(entry.entry_id, device)
 
-    await async_update_devices(hass, scanner, devices)
-
-    coordinator = IphoneDetectUpdateCoordinator(hass, device)
-    await coordinator.async_config_entry_first_refresh()
-    coordinators[entry.entry_id] = coordinator
+    await async_join_first_scan(hass)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
@@ -81,9 +197,90 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def async_scan(hass: HomeAssistant, wait: bool = False) -> None:
+    """Update reachability for tracked devices and refresh the entities.
+
+    Only one scan runs at a time. A scan requested while another one is
+    running is skipped, unless `wait` is set.
+    """
+    data: dict[str, Any] = hass.data[DOMAIN]
+    if (coordinator := data.get(DATA_COORDINATOR)) is None:
+        return
+
+    lock: asyncio.Lock = data[DATA_SCAN_LOCK]
+    stats: ScanStats = data[DATA_SCAN_STATS]
+    if lock.locked() and not wait:
+        stats.skipped += 1
+        _LOGGER.debug("Previous scan still running, skipped %d scans so far", stats.skipped)
+        return
+
+    async with lock:
+        start = hass.loop.time()
+        try:
+            sample = await async_update_devices(
+                hass, data[DATA_SCANNER], data[DATA_PINGER], data[DATA_SCHEDULER], data[CONF_DEVICES]
+            )
+            refresh_start = hass.loop.time()
+            await coordinator.async_refresh()
+            data[DATA_SNAPSHOT].async_schedule_save()
+            if sample is not None:
+                sample.refresh_time = hass.loop.time() - refresh_start
+                stats.samples.append(sample)
+        finally:
+            duration = hass.loop.time() - start
+            stats.cycles += 1
+            stats.last_duration = duration
+            stats.max_duration = max(stats.max_duration, duration)
+            if duration > PROBE_INTERVAL:
+                stats.overruns += 1
+                _LOGGER.debug("Scan took %.2fs, longer than the %ss interval", duration, PROBE_INTERVAL)
+
+    async_dispatcher_send(hass, SIGNAL_SCAN_STATS)
+
+
+@callback
+def async_apply_consider_home(hass: HomeAssistant) -> None:
+    """Update consider_home to the suggestion from the presence history, for entries that enabled it."""
+    devices: dict[str, DeviceData] = hass.data[DOMAIN].get(CONF_DEVICES, {})
+
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if not entry.options.get(CONF_AUTO_CONSIDER_HOME) or (device := devices.get(entry.entry_id)) is None:
+            continue
+        suggested = device._history.suggest_consider_home()
+        if suggested is None or suggested == entry.options[CONF_CONSIDER_HOME]:
+            continue
+
+        _LOGGER.info(
+            "Changing consider home of '%s' from %ss to %ss",
+            entry.title,
+            entry.options[CONF_CONSIDER_HOME],
+            suggested,
+        )
+        hass.config_entries.async_update_entry(entry, options=entry.options | {CONF_CONSIDER_HOME: suggested})
+
+
+async def async_join_first_scan(hass: HomeAssistant) -> None:
+    """Wait for one scan shared by all entries set up within SETUP_SCAN_DELAY."""
+    data: dict[str, Any] = hass.data[DOMAIN]
+
+    if (scan := data.get(DATA_FIRST_SCAN)) is None:
+        async def _first_scan() -> None:
+            """Scan once the entries set up meanwhile have registered their devices."""
+            await asyncio.sleep(SETUP_SCAN_DELAY)
+            data.pop(DATA_FIRST_SCAN, None)
+            _LOGGER.debug("Running first scan for %d devices", len(data[CONF_DEVICES]))
+            await async_scan(hass, wait=True)
+
+        scan = data[DATA_FIRST_SCAN] = hass.async_create_task(_first_scan(), "iphonedetect_first_scan")
+
+    await asyncio.shield(scan)
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Update options."""
     _LOGGER.debug("Reloading entity '%s' with '%s'", entry.title, entry.options)
+    # The IP address may have changed
+    async_invalidate_entry_index(hass)
     await hass.config_entries.async_reload(entry.entry_id)
 
 
@@ -93,17 +290,41 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok:
         data: dict[str, Any] = hass.data[DOMAIN]
         _LOGGER.debug("Removing '%s' from tracked devices", entry.options[CONF_IP_ADDRESS])
-        data[CONF_DEVICES].pop(entry.entry_id, None)
-        data.get(DATA_COORDINATORS, {}).pop(entry.entry_id, None)
+        if (device := data[CONF_DEVICES].pop(entry.entry_id, None)) is not None:
+            snapshot: ReachabilitySnapshot = data[DATA_SNAPSHOT]
+            snapshot.keep(entry.entry_id, device)
+            snapshot.async_schedule_save()
+        coordinator: IphoneDetectUpdateCoordinator = data[DATA_COORDINATOR]
+        coordinator.async_remove_device(entry.entry_id)
+        if data.get(DATA_STATS_ENTRY) == entry.entry_id:
+            data.pop(DATA_STATS_ENTRY)
 
         if not data[CONF_DEVICES]:
             if unsub_update := data.pop(DATA_UNSUB_UPDATE, None):
                 unsub_update()
-            data.pop(DATA_SCANNER, None)
+            if unsub_history := data.pop(DATA_UNSUB_HISTORY, None):
+                unsub_history()
+            await data.pop(DATA_COORDINATOR).async_shutdown()
+            data.pop(DATA_PINGER).close()
+            data.pop(DATA_SCHEDULER, None)
+            data.pop(DATA_SCAN_STATS, None)
+            scanner = data.pop(DATA_SCANNER, None)
+            if isinstance(scanner, PushScanner):
+                await scanner.async_stop()
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the presence history, last sighting and the name and IP address of a removed entry."""
+    data: dict[str, Any] = hass.data.get(DOMAIN, {})
+    data.get(DATA_HISTORY, {}).pop(entry.entry_id, None)
+    if (snapshot := data.get(DATA_SNAPSHOT)) is not None:
+        snapshot.forget(entry.entry_id)
+        snapshot.async_schedule_save()
+    async_invalidate_entry_index(hass)
+
+
 async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Migrate old config entry to a new format."""
 
@@ -0,0 +1,27 @@
+"""Run the neighbour table agent for iPhone Detect without Home Assistant.
+
+Run the directory of the integration on a host with only pyroute2 or
+iproute2 installed, e.g. after copying it there:
+
+    python3 iphonedetect --port 7563
+
+The modules the agent uses are loaded as a package without running the
+package `__init__`, which sets up the integration and needs Home Assistant.
+"""
+
+import os
+import runpy
+import sys
+import types
+
+if __package__:
+    # Run with `python -m custom_components.iphonedetect`, the package is already imported
+    runpy.run_module(f"{__package__}.agent", run_name="__main__", alter_sys=True)
+else:
+    directory = os.path.dirname(os.path.abspath(__file__))
+    # Its modules are only loaded as part of the package
+    del sys.path[0]
+    package = types.ModuleType("iphonedetect")
+    package.__path__ = [directory]
+    sys.modules[package.__name__] = package
+    runpy.run_module(f"{package.__name__}.agent", run_name="__main__", alter_sys=True)
@@ -0,0 +1,310 @@
+"""Neighbour table agent for iPhone Detect.
+
+Runs on a host attached to the network of the tracked devices, for Home
+Assistant instances that are not, e.g. in a VM or on another segment. The
+agent reads its own neighbour table with the scanners of the integration and
+streams it to ScannerRemote, set up with the `agent` option. It needs only
+pyroute2 or iproute2, run the directory of the integration, see `__main__`:
+
+    python3 custom_components/iphonedetect --port 7563
+
+Each line sent is a JSON object: `{"snapshot": {ip: mac}}` with all reachable
+neighbours on connect, IPv6 ones too when the scanner reads them, then
+`{"up": {ip: mac}, "down": [ip]}` with the changes, or `{}` as heartbeat. Clients send `{"probe": [ip]}` to have
+addresses probed from the agent. There is no authentication, only listen on
+trusted networks.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence
+
+from .const import AGENT_HEARTBEAT, AGENT_INTERVAL, DEFAULT_AGENT_PORT, DEFAULT_PROBE_BUDGET, DEFAULT_PROBE_BURST
+from .scanner import (
+    AGENT_LINE_LIMIT,
+    SCANNERS,
+    NeighbourDiscoveryScanner,
+    Pinger,
+    PushScanner,
+    Scanner,
+    async_detect_scanner,
+    is_address_list,
+)
+from .scheduler import TokenBucket
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bytes queued for a client before changes are dropped and it resyncs
+AGENT_BUFFER_LIMIT = 1 << 20
+
+
+class AgentHost:
+    """Run the scanners outside Home Assistant, in place of `hass`."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the host."""
+        self.loop = loop
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="iphonedetect_agent")
+
+    def async_add_executor_job(self, target: Callable, *args: Any) -> asyncio.Future:
+        """Run a job in the executor."""
+        return self.loop.run_in_executor(self._executor, target, *args)
+
+    async_add_import_executor_job = async_add_executor_job
+
+    def async_create_task(self, target: Any, name: str | None = None) -> asyncio.Task:
+        """Create a task."""
+        return self.loop.create_task(target, name=name)
+
+    def async_create_background_task(self, target: Any, name: str) -> asyncio.Task:
+        """Create a task."""
+        return self.loop.create_task(target, name=name)
+
+    def close(self) -> None:
+        """Shut the executor down."""
+        self._executor.shutdown(wait=False)
+
+
+@dataclass(slots=True)
+class AgentStats:
+    """Messages sent to all clients since the agent started."""
+
+    snapshots: int = 0
+    changes: int = 0
+    resyncs: int = 0
+    bytes_sent: int = 0
+
+
+@dataclass(slots=True, eq=False)
+class AgentClient:
+    """A connected client, waiting for a snapshot while `resync` is set."""
+
+    writer: asyncio.StreamWriter
+    resync: bool = True
+
+
+class Agent:
+    """Serve the reachable neighbours of `scanner` to any number of clients.
+
+    The table is read every `interval`, a copy of the table kept by listening
+    scanners, and only the changes are sent, the same message to every client.
+    A client falling behind by more than AGENT_BUFFER_LIMIT stops receiving
+    changes, and gets a new snapshot once its connection has drained.
+
+    Addresses clients ask for are probed at most `bucket.rate` per second for
+    all clients together, and only when on a network attached to the agent.
+    """
+
+    def __init__(
+        self,
+        host: Any,
+        scanner: Scanner,
+        pinger: Pinger | None = None,
+        bucket: TokenBucket | None = None,
+        interval: float = AGENT_INTERVAL,
+    ) -> None:
+        """Initialize the agent, `host` stands in for `hass` with the scanners."""
+        self.host = host
+        self.scanner = scanner
+        self.pinger = pinger or Pinger()
+        self.bucket = bucket or TokenBucket(DEFAULT_PROBE_BUDGET, DEFAULT_PROBE_BURST)
+        self.interval = interval
+        self.stats = AgentStats()
+        self.neighbours: dict[str, str] = {}
+        self._clients: list[AgentClient] = []
+        self._pending: set[str] = set()
+        self._poll_task: asyncio.Task | None = None
+        self._probe_task: asyncio.Task | None = None
+        self._server: asyncio.Server | None = None
+
+    async def async_start(self, address: str | None, port: int) -> asyncio.Server:
+        """Read the table and start serving it on `address` and `port`."""
+        if isinstance(self.scanner, PushScanner):
+            await self.scanner.async_start(self.host, {}, lambda _: None)
+        self.neighbours = await self._async_read()
+        self._poll_task = self.host.async_create_background_task(self._async_poll(), "iphonedetect_agent_poll")
+        self._server = await asyncio.start_server(self._async_handle_client, address, port, limit=AGENT_LINE_LIMIT)
+        return self._server
+
+    async def async_stop(self) -> None:
+        """Disconnect all clients and stop serving."""
+        for task in (self._poll_task, self._probe_task):
+            if task is not None:
+                task.cancel()
+        if self._server is not None:
+            self._server.close()
+        for client in self._clients:
+            client.writer.close()
+        self._clients.clear()
+        if isinstance(self.scanner, PushScanner):
+            await self.scanner.async_stop()
+        self.pinger.close()
+
+    async def _async_poll(self) -> None:
+        """Send the changes of the table to the clients, or a heartbeat when idle."""
+        idle = 0.0
+        while True:
+            await asyncio.sleep(self.interval)
+            neighbours = await self._async_read()
+            up = {
+                ip_address: lladdr
+                for ip_address, lladdr in neighbours.items()
+                if self.neighbours.get(ip_address) != lladdr
+            }
+            down = [ip_address for ip_address in self.neighbours if ip_address not in neighbours]
+            self.neighbours = neighbours
+
+            idle += self.interval
+            if up or down:
+                self.stats.changes += 1
+                self._publish({"up": up, "down": down})
+                idle = 0
+            elif idle >= AGENT_HEARTBEAT:
+                self._publish({})
+                idle = 0
+            else:
+                # Nothing to send, but clients that caught up get their snapshot
+                self._publish(None)
+
+    async def _async_read(self) -> dict[str, str]:
+        """Return the reachable neighbours of both families."""
+        neighbours = await self.scanner.get_arp_records(self.host)
+        if isinstance(self.scanner, NeighbourDiscoveryScanner):
+            neighbours |= await self.scanner.get_ndp_records(self.host)
+        return neighbours
+
+    def _publish(self, message: dict[str, Any] | None) -> None:
+        """Send `message` to every client that is up to date, and a snapshot to those that caught up."""
+        line = self._encode(message) if message is not None else None
+        for client in self._clients:
+            if client.writer.transport.get_write_buffer_size() > AGENT_BUFFER_LIMIT:
+                if not client.resync:
+                    _LOGGER.debug("Client %s fell behind, resyncing", client.writer.get_extra_info("peername"))
+                    self.stats.resyncs += 1
+                    client.resync = True
+            elif client.resync:
+                self._send_snapshot(client)
+            elif line is not None:
+                self._write(client, line)
+
+    def _send_snapshot(self, client: AgentClient) -> None:
+        """Send all reachable neighbours to a client."""
+        self.stats.snapshots += 1
+        client.resync = False
+        self._write(client, self._encode({"snapshot": self.neighbours}))
+
+    def _write(self, client: AgentClient, line: bytes) -> None:
+        """Queue a line for a client."""
+        self.stats.bytes_sent += len(line)
+        client.writer.write(line)
+
+    @staticmethod
+    def _encode(message: dict[str, Any]) -> bytes:
+        """Return a message as one line of compact JSON."""
+        return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+    async def _async_handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve a client until it disconnects."""
+        peer = writer.get_extra_info("peername")
+        client = AgentClient(writer)
+        self._clients.append(client)
+        self._send_snapshot(client)
+        _LOGGER.info("Client %s connected, %d clients", peer, len(self._clients))
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                # A client sending anything else is dropped, like a broken connection
+                if not isinstance(message, dict) or not is_address_list(probe := message.get("probe", [])):
+                    raise ValueError(f"Unexpected message: {message!r:.100}")
+                if probe:
+                    self._request_probes(probe)
+        except (OSError, ValueError) as exc:
+            _LOGGER.debug("Exception on client %s: %s", peer, exc)
+        finally:
+            # Clients are already gone when the agent stopped
+            if client in self._clients:
+                self._clients.remove(client)
+            writer.close()
+            _LOGGER.info("Client %s disconnected, %d clients", peer, len(self._clients))
+
+    def _request_probes(self, ip_addresses: Sequence[str]) -> None:
+        """Queue addresses to probe, merging the requests of all clients."""
+        self._pending.update(ip_addresses)
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = self.host.async_create_task(self._async_probe(), "iphonedetect_agent_probe")
+
+    async def _async_probe(self) -> None:
+        """Probe queued addresses on attached networks until none are left."""
+        await self.pinger.interfaces.async_refresh(self.host)
+        while self._pending:
+            pending, self._pending = self._pending, set()
+            ip_addresses: list[str] = []
+            ip6_addresses: list[str] = []
+            for ip_address in pending:
+                try:
+                    address = ipaddress.ip_address(ip_address)
+                except ValueError:
+                    continue
+                if self.pinger.interfaces.get(ip_address) is not None:
+                    (ip_addresses if address.version == 4 else ip6_addresses).append(ip_address)
+
+            _LOGGER.debug(
+                "Probing %d of %d requested addresses", len(ip_addresses) + len(ip6_addresses), len(pending)
+            )
+            async for _ in self.pinger.async_ping(self.host.loop, ip_addresses, self.bucket):
+                pass
+            if ip6_addresses:
+                await self.pinger.async_ping_multicast(self.host.loop, ip6_addresses)
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the agent until cancelled."""
+    host = AgentHost(asyncio.get_running_loop())
+    try:
+        if args.scanner is not None:
+            scanner = SCANNERS[args.scanner]()
+        else:
+            _, scanner = await async_detect_scanner(host)
+
+        agent = Agent(host, scanner, bucket=TokenBucket(args.budget, args.burst), interval=args.interval)
+        server = await agent.async_start(args.host, args.port)
+        _LOGGER.info(
+            "Serving %d neighbours from %s on %s",
+            len(agent.neighbours),
+            type(scanner).__name__,
+            [sock.getsockname() for sock in server.sockets],
+        )
+        try:
+            await server.serve_forever()
+        finally:
+            await agent.async_stop()
+    finally:
+        host.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=None, help="address to listen on, all by default")
+    parser.add_argument("--port", type=int, default=DEFAULT_AGENT_PORT, help="port to listen on")
+    parser.add_argument("--scanner", choices=list(SCANNERS), default=None, help="scanner to use, detected by default")
+    parser.add_argument("--interval", type=float, default=AGENT_INTERVAL, help="seconds between table reads")
+    parser.add_argument("--budget", type=float, default=DEFAULT_PROBE_BUDGET, help="probes per second")
+    parser.add_argument("--burst", type=int, default=DEFAULT_PROBE_BURST, help="probes sent at once")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log at debug level")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    try:
+        asyncio.run(async_main(args))
+    except KeyboardInterrupt:
+        pass
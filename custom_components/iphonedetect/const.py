@@ -5,4 +5,29 @@ DOMAIN = "iphonedetect"
 DEFAULT_CONSIDER_HOME: int = 24
 
 PROBE_INTERVAL: float = 5
-UPDATE_INTERVAL: float = 8
+PROBE_REPLY_TIMEOUT: float = 0.25
+PROBE_PACE_TICK: float = 0.25
+SETUP_SCAN_DELAY: float = 1
+INTERFACE_REFRESH_INTERVAL: float = 60
+AGENT_INTERVAL: float = 1
+AGENT_HEARTBEAT: float = 15
+SNAPSHOT_SAVE_DELAY: float = 300
+
+CONF_AGENT = "agent"
+CONF_AUTO_CONSIDER_HOME = "auto_consider_home"
+CONF_PROBE_BACKOFF = "probe_backoff"
+CONF_PROBE_BUDGET = "probe_budget"
+CONF_PROBE_BURST = "probe_burst"
+CONF_TRACK_MAC = "track_mac"
+DEFAULT_PROBE_BACKOFF: float = PROBE_INTERVAL
+DEFAULT_PROBE_BUDGET: float = 50
+DEFAULT_PROBE_BURST: int = 20
+DEFAULT_AGENT_PORT: int = 7563
+
+STATS_SAMPLES: int = 120
+SIGNAL_SCAN_STATS = f"{DOMAIN}_scan_stats"
+
+HISTORY_SIZE: int = 64
+HISTORY_MIN_GAPS: int = 10
+HISTORY_MAX_GAP: float = 900
+HISTORY_APPLY_INTERVAL: float = 3600
@@ -2,16 +2,18 @@
 
 from __future__ import annotations
 
+import heapq
 import logging
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import dt as dt_util
 
-from .const import UPDATE_INTERVAL
+from .const import DOMAIN
 
 if TYPE_CHECKING:
     from .scanner import DeviceData
@@ -26,63 +28,161 @@ class DeviceConnected:
     is_connected: bool | None = None
 
 
-class IphoneDetectUpdateCoordinator(DataUpdateCoordinator[DeviceConnected]):
-    """The update coordinator."""
+class IphoneDetectUpdateCoordinator(DataUpdateCoordinator[dict[str, DeviceConnected]]):
+    """The update coordinator, shared by all tracked devices and refreshed after each scan."""
 
-    def __init__(self, hass: HomeAssistant, device: DeviceData) -> None:
+    def __init__(self, hass: HomeAssistant, devices: dict[str, DeviceData]) -> None:
         """Initialize the coordinator."""
-        self.device = device
-        self._not_seen_yet = dt_util.utcnow()
+        self.devices = devices
+        self._not_seen_yet: dict[str, datetime] = {}
+
+        # Pending consider_home deadlines, the heap may hold outdated entries
+        self._deadlines: dict[str, datetime] = {}
+        self._expiry_heap: list[tuple[datetime, str]] = []
+        self._expired: set[str] = set()
+        self._next_expiry: datetime | None = None
+        self._unsub_expiry: CALLBACK_TYPE | None = None
 
         super().__init__(
             hass,
             _LOGGER,
-            name=self.device.title,
-            update_interval=timedelta(seconds=UPDATE_INTERVAL),
+            name=DOMAIN,
+            always_update=False,
         )
 
-    def is_connected(self) -> bool | None:
+    def is_connected(self, entry_id: str) -> bool | None:
         """Return if device is considered connected."""
+        device = self.devices[entry_id]
 
-        if self.device._reachable:
-            _LOGGER.debug("Device '%s' (%s) is home", self.device.title, self.device.ip_address)
+        if device._reachable:
+            self._deadlines.pop(entry_id, None)
+            self._expired.discard(entry_id)
+            _LOGGER.debug("Device '%s' (%s) is home", device.title, device.ip_address)
             return True
 
-        if self.device._last_seen is not None:
-            _last_seen: timedelta = dt_util.utcnow() - self.device._last_seen
-            if _last_seen < self.device.consider_home:
-                _LOGGER.debug(
-                    "Device '%s' (%s) considered home, seen: %ss ago",
-                    self.device.title,
-                    self.device.ip_address,
-                    round(_last_seen.total_seconds(), 2),
-                )
-                return True
-            else:
+        if device._last_seen is not None:
+            if entry_id not in self._deadlines and entry_id not in self._expired:
+                self._schedule_expiry(entry_id, device._last_seen + device.consider_home)
+
+            if entry_id in self._expired:
                 _LOGGER.debug(
                     "Device '%s' (%s) considered not home",
-                    self.device.title,
-                    self.device.ip_address,
+                    device.title,
+                    device.ip_address,
                 )
                 return False
+
+            _LOGGER.debug(
+                "Device '%s' (%s) considered home, last seen: %s",
+                device.title,
+                device.ip_address,
+                device._last_seen,
+            )
+            return True
         else:
             _LOGGER.debug(
                 "Device '%s' (%s) not seen since last restart",
-                self.device.title,
-                self.device.ip_address,
+                device.title,
+                device.ip_address,
             )
-            _not_seen: timedelta = dt_util.utcnow() - self._not_seen_yet
-            if _not_seen > self.device.consider_home:
-                _LOGGER.debug(
-                    "Device '%s' (%s) considered not home after HA restart",
-                    self.device.title,
-                    self.device.ip_address,
-                )
-                self.device._last_seen = self._not_seen_yet - self.device.consider_home
-                return False
+            if entry_id not in self._not_seen_yet:
+                not_seen_yet = self._not_seen_yet[entry_id] = dt_util.utcnow()
+                self._schedule_expiry(entry_id, not_seen_yet + device.consider_home)
 
             return None
 
-    async def _async_update_data(self) -> DeviceConnected:
+    def _schedule_expiry(self, entry_id: str, deadline: datetime) -> None:
+        """Add a consider_home deadline for a device that is no longer reachable."""
+        if deadline <= dt_util.utcnow():
+            self._expire(entry_id)
+            return
+
+        self._deadlines[entry_id] = deadline
+        heapq.heappush(self._expiry_heap, (deadline, entry_id))
+        self._schedule_next_expiry()
+
+    def _schedule_next_expiry(self) -> None:
+        """Arm a single timer for the earliest pending deadline."""
+        heap = self._expiry_heap
+        while heap and self._deadlines.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+        next_expiry = heap[0][0] if heap else None
+        if next_expiry == self._next_expiry:
+            return
+
+        if self._unsub_expiry is not None:
+            self._unsub_expiry()
+            self._unsub_expiry = None
+
+        self._next_expiry = next_expiry
+        if next_expiry is not None:
+            self._unsub_expiry = async_track_point_in_utc_time(self.hass, self._async_handle_expiry, next_expiry)
+
+    def _expire(self, entry_id: str) -> None:
+        """Mark a device as not home once its consider_home window has passed."""
+        self._deadlines.pop(entry_id, None)
+        self._expired.add(entry_id)
+
+        device = self.devices.get(entry_id)
+        if device is not None and device._last_seen is None and entry_id in self._not_seen_yet:
+            _LOGGER.debug(
+                "Device '%s' (%s) considered not home after HA restart",
+                device.title,
+                device.ip_address,
+            )
+            device._last_seen = self._not_seen_yet[entry_id] - device.consider_home
+
+    @callback
+    def _async_handle_expiry(self, now: datetime) -> None:
+        """Expire all devices whose deadline has passed."""
+        self._unsub_expiry = None
+        self._next_expiry = None
+
+        expired = []
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            deadline, entry_id = heapq.heappop(heap)
+            if self._deadlines.get(entry_id) == deadline:
+                self._expire(entry_id)
+                expired.append(entry_id)
+
+        self._schedule_next_expiry()
+
+        if expired:
+            self.async_update_device(*expired)
+
+    @callback
+    def async_remove_device(self, entry_id: str) -> None:
+        """Forget all state kept for a device."""
+        self._not_seen_yet.pop(entry_id, None)
+        self._deadlines.pop(entry_id, None)
+        self._expired.discard(entry_id)
+        self._schedule_next_expiry()
+
+    @callback
+    def async_update_device(self, *entry_ids: str) -> None:
+        """Push device changes to the entities in a single update."""
+        if self.data is None:
+            return
+
+        changed = {}
+        for entry_id in entry_ids:
+            if entry_id not in self.devices:
+                continue
+            connected = DeviceConnected(is_connected=self.is_connected(entry_id))
+            if self.data.get(entry_id) != connected:
+                changed[entry_id] = connected
+
+        if changed:
+            self.async_set_updated_data(self.data | changed)
+
+    async def async_shutdown(self) -> None:
+        """Cancel the expiry timer."""
+        await super().async_shutdown()
+        self._deadlines.clear()
+        self._schedule_next_expiry()
+
+    async def _async_update_data(self) -> dict[str, DeviceConnected]:
         """Trigger check."""
-        return DeviceConnected(is_connected=self.is_connected())
+        return {entry_id: DeviceConnected(is_connected=self.is_connected(entry_id)) for entry_id in self.devices}
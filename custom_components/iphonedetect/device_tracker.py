@@ -10,6 +10,7 @@ from homeassistant.const import (
     STATE_HOME,
     STATE_NOT_HOME,
 )
+from homeassistant.core import callback
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
@@ -31,7 +32,7 @@ async def async_setup_entry(
 ) -> None:
     """Setup device tracker for iPhone Detect."""
 
-    coordinator: IphoneDetectUpdateCoordinator = hass.data[DOMAIN]["coordinators"][entry.entry_id]
+    coordinator: IphoneDetectUpdateCoordinator = hass.data[DOMAIN]["coordinator"]
 
     async_add_entities([IphoneDetectDeviceTracker(entry, coordinator)])
 
@@ -48,7 +49,9 @@ class IphoneDetectDeviceTracker(CoordinatorEntity[IphoneDetectUpdateCoordinator]
 
         self._attr_name = entry.title
         self._attr_unique_id = entry.entry_id
+        self._entry_id = entry.entry_id
         self._restored_state: bool | None = None
+        self._written_state: bool | None = None
 
     async def async_added_to_hass(self):
         """Handle entity which will be added to Home Assistant."""
@@ -67,11 +70,21 @@ class IphoneDetectDeviceTracker(CoordinatorEntity[IphoneDetectUpdateCoordinator]
                 "Added '%s' to hass with no usable restored state",
                 self._attr_name,
             )
+        self._written_state = self.is_connected
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the connection state flips."""
+        if (is_connected := self.is_connected) == self._written_state:
+            return
+        self._written_state = is_connected
+        super()._handle_coordinator_update()
 
     @property
     def is_connected(self) -> bool | None:
         """Return the connection state of the device."""
-        current_state = self.coordinator.data.is_connected
+        device = self.coordinator.data.get(self._entry_id) if self.coordinator.data else None
+        current_state = device.is_connected if device is not None else None
         return current_state if current_state is not None else self._restored_state
 
     @property
@@ -0,0 +1,45 @@
+"""Diagnostics support for iPhone Detect."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import CONF_DEVICES
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .scanner import DeviceData
+    from .stats import ScanStats
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data: dict[str, Any] = hass.data[DOMAIN]
+    device: DeviceData | None = data.get(CONF_DEVICES, {}).get(entry.entry_id)
+    stats: ScanStats | None = data.get("scan_stats")
+
+    return {
+        "options": dict(entry.options),
+        "device": {
+            "ip_address": device.ip_address,
+            "mac_address": device.mac_address,
+            "track_mac": device.track_mac,
+            "consider_home": device.consider_home.total_seconds(),
+            "reachable": device._reachable,
+            "last_seen": device._last_seen,
+            "history": {
+                "gaps_recorded": device._history.count,
+                "gap_histogram": device._history.histogram(),
+                "suggested_consider_home": device._history.suggest_consider_home(),
+            },
+        }
+        if device is not None
+        else None,
+        "scanner": type(data["scanner"]).__name__ if "scanner" in data else None,
+        "tracked_devices": len(data.get(CONF_DEVICES, {})),
+        "scan_stats": stats.as_dict() if stats is not None else None,
+    }
@@ -0,0 +1,64 @@
+"""Presence history for iPhone Detect."""
+
+from __future__ import annotations
+
+import math
+from array import array
+
+from .const import DEFAULT_CONSIDER_HOME, HISTORY_MAX_GAP, HISTORY_MIN_GAPS, HISTORY_SIZE, PROBE_INTERVAL
+
+GAP_BUCKETS = (10, 20, 30, 60, 120, 300, 600, 900)
+
+
+class GapHistory:
+    """Ring buffer of the last HISTORY_SIZE absences of a device.
+
+    An absence lasts from the first failed probe after a sighting to the next
+    sighting, so a device that never leaves records none.
+
+    Gaps are kept in whole seconds in an unsigned short array, so every device
+    uses the same small amount of memory however long it is tracked.
+    """
+
+    __slots__ = ("_gaps", "_index", "count")
+
+    def __init__(self) -> None:
+        """Initialize an empty history."""
+        self._gaps = array("H", bytes(2 * HISTORY_SIZE))
+        self._index = 0
+        self.count = 0
+
+    def add(self, gap: float) -> None:
+        """Record an absence in seconds."""
+        self._gaps[self._index] = min(int(gap), 0xFFFF)
+        self._index = (self._index + 1) % HISTORY_SIZE
+        self.count += 1
+
+    @property
+    def gaps(self) -> list[int]:
+        """Return the kept gaps, oldest first."""
+        if self.count < HISTORY_SIZE:
+            return self._gaps[: self.count].tolist()
+        return (self._gaps[self._index :] + self._gaps[: self._index]).tolist()
+
+    def histogram(self) -> dict[str, int]:
+        """Return the number of kept gaps per bucket of seconds."""
+        buckets = {f"<={limit}": 0 for limit in GAP_BUCKETS}
+        buckets[f">{GAP_BUCKETS[-1]}"] = 0
+        for gap in self.gaps:
+            label = next((f"<={limit}" for limit in GAP_BUCKETS if gap <= limit), f">{GAP_BUCKETS[-1]}")
+            buckets[label] += 1
+        return buckets
+
+    def suggest_consider_home(self) -> int | None:
+        """Return a consider_home covering 95% of the absences, in seconds.
+
+        Absences longer than HISTORY_MAX_GAP are taken as the device being away.
+        A device at home is probed again halfway through its consider_home, so
+        an absence has to fit in the second half, and be seen one probe later.
+        """
+        gaps = sorted(gap for gap in self.gaps if gap <= HISTORY_MAX_GAP)
+        if len(gaps) < HISTORY_MIN_GAPS:
+            return None
+        p95 = gaps[math.ceil(0.95 * len(gaps)) - 1]
+        return max(DEFAULT_CONSIDER_HOME, math.ceil(2 * (p95 + PROBE_INTERVAL)))
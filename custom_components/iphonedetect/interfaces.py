@@ -0,0 +1,126 @@
+"""Interface lookup for iPhone Detect."""
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import logging
+import socket
+import subprocess
+from contextlib import closing
+from importlib.util import find_spec
+from ipaddress import IPv4Network, IPv6Network, ip_interface
+from typing import TYPE_CHECKING, Sequence
+
+from .const import INTERFACE_REFRESH_INTERVAL
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class InterfaceMap:
+    """Map addresses to the interface of the attached network containing them.
+
+    Networks are read from the host adapters at most every
+    INTERFACE_REFRESH_INTERVAL, or on the next refresh after `invalidate`.
+    Addresses outside every attached network map to None. IPv6 networks other
+    than link-local ones are included.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the map."""
+        self._networks: list[tuple[IPv4Network | IPv6Network, str]] = []
+        self._interfaces: dict[str, str | None] = {}
+        self._refreshed: float | None = None
+
+    @staticmethod
+    def _get_addresses() -> list[tuple[str, int, str]]:
+        """Return the addresses of the host adapters as (address, prefix length, adapter name).
+
+        They are read with ifaddr, which comes with Home Assistant. Without it,
+        e.g. on an agent host, with pyroute2 or else `ip`, whichever is there.
+        """
+        if find_spec("ifaddr") is not None:
+            import ifaddr
+
+            return [
+                # ifaddr gives IPv6 addresses as (address, flowinfo, scope_id)
+                (ip.ip if ip.is_IPv4 else ip.ip[0], ip.network_prefix, adapter.name)
+                for adapter in ifaddr.get_adapters()
+                for ip in adapter.ips
+            ]
+
+        if find_spec("pyroute2") is not None:
+            from pyroute2 import IPRoute
+
+            with closing(IPRoute()) as ipr:
+                return [
+                    (
+                        addr.get("IFA_LOCAL") or addr.get("IFA_ADDRESS"),
+                        addr["prefixlen"],
+                        socket.if_indextoname(addr["index"]),
+                    )
+                    for addr in ipr.get_addr()
+                ]
+
+        output = subprocess.run(["ip", "-j", "addr", "show"], capture_output=True, check=True, timeout=10).stdout
+        return [
+            (info["local"], info["prefixlen"], link["ifname"]) for link in json.loads(output) for info in link["addr_info"]
+        ]
+
+    @classmethod
+    def _get_networks(cls) -> list[tuple[IPv4Network | IPv6Network, str]]:
+        """Return the networks of the host adapters, most specific first."""
+        try:
+            addresses = cls._get_addresses()
+        except (OSError, ValueError, KeyError, subprocess.SubprocessError) as exc:
+            _LOGGER.debug("Unable to read the host adapters: %s", exc)
+            return []
+
+        networks = []
+        for address, prefixlen, name in addresses:
+            network = ip_interface(f"{address}/{prefixlen}").network
+            if not network.is_loopback and (network.version == 4 or not network.is_link_local):
+                networks.append((network, name))
+
+        return sorted(networks, key=lambda network: network[0].prefixlen, reverse=True)
+
+    async def async_refresh(self, hass: HomeAssistant) -> bool:
+        """Reload the networks when due, and return if they changed."""
+        now = hass.loop.time()
+        if self._refreshed is not None and now - self._refreshed < INTERFACE_REFRESH_INTERVAL:
+            return False
+
+        networks = await hass.async_add_executor_job(self._get_networks)
+        self._refreshed = now
+        if networks == self._networks:
+            return False
+
+        _LOGGER.debug("Attached networks changed: %s", [f"{network} on {name}" for network, name in networks])
+        self._networks = networks
+        self._interfaces.clear()
+        return True
+
+    def invalidate(self) -> None:
+        """Reload the networks on the next refresh."""
+        self._refreshed = None
+
+    def get(self, ip_address: str) -> str | None:
+        """Return the interface for `ip_address`."""
+        try:
+            return self._interfaces[ip_address]
+        except KeyError:
+            address = ipaddress.ip_address(ip_address)
+            interface = self._interfaces[ip_address] = next(
+                (name for network, name in self._networks if address in network), None
+            )
+            return interface
+
+    def group(self, ip_addresses: Sequence[str]) -> dict[str | None, list[str]]:
+        """Return `ip_addresses` grouped by interface."""
+        groups: dict[str | None, list[str]] = {}
+        for ip_address in ip_addresses:
+            groups.setdefault(self.get(ip_address), []).append(ip_address)
+        return groups
@@ -3,23 +3,70 @@
 from __future__ import annotations
 
 import asyncio
+import errno
+import importlib
+import ipaddress
+import json
 import logging
+import os
+import platform
+import shutil
 import socket
-from contextlib import closing
-from dataclasses import dataclass
+import struct
+from abc import ABC, abstractmethod
+from contextlib import closing, suppress
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Protocol, Sequence
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Protocol, Sequence, runtime_checkable
 
-from homeassistant.util import dt as dt_util
-from pyroute2 import IPRoute
+from .const import AGENT_HEARTBEAT, DEFAULT_AGENT_PORT, DOMAIN, PROBE_PACE_TICK, PROBE_REPLY_TIMEOUT
+from .history import GapHistory
+from .interfaces import InterfaceMap
+from .stats import CycleSample
 
 if TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
+    from pyroute2 import IPRoute
+
+    from .scheduler import ProbeScheduler, TokenBucket
 
 _LOGGER = logging.getLogger(__name__)
 
 CMD_IP_NEIGH = "ip -4 neigh show nud reachable"
+CMD_IP_NEIGH_ALL = "ip -4 neigh show"
+CMD_IP6_NEIGH = "ip -6 neigh show nud reachable"
+CMD_IP_MONITOR = "ip monitor neigh"
 CMD_ARP = "arp -ne"
+PROC_NET_ARP = "/proc/net/arp"
+
+ATF_COM = 0x02
+
+NUD_NONE = 0x00
+NUD_REACHABLE = 0x02
+# Permanent, reachable, stale, delay and probe entries have a known link layer address
+NUD_LLADDR_KNOWN = 0x9E
+NTF_USE = 0x01
+
+PROBE_PORT = 5353
+PROBE_CHUNK_SIZE = 64
+PROBE_GROUP6 = "ff02::fb"
+# Largest multicast query, questions beyond are sent in another one
+PROBE_MULTICAST_SIZE = 1232
+DNS_TYPE_PTR = 12
+DNS_CLASS_IN = 1
+# Asks for the answer to be sent to the querier only
+DNS_UNICAST_RESPONSE = 0x8000
+
+STORAGE_KEY = f"{DOMAIN}.scanner"
+STORAGE_VERSION = 1
+
+MONITOR_BACKOFF_MIN: float = 1
+MONITOR_BACKOFF_MAX: float = 60
+
+# Longest line read from an agent connection, a snapshot of the whole table is one line
+AGENT_LINE_LIMIT = 1 << 24
 
 
 @dataclass(slots=True, kw_only=True)
@@ -27,19 +74,321 @@ class DeviceData:
     ip_address: str
     consider_home: timedelta
     title: str
+    mac_address: str | None = None
+    track_mac: bool = False
     _reachable: bool = False
     _last_seen: datetime | None = None
+    _history: GapHistory = field(default_factory=GapHistory)
+    # Set by a sighting since setup, a restored or expired _last_seen does not count
+    _observed: bool = False
+    _missing_since: datetime | None = None
+
+    def _seen(self, now: datetime) -> None:
+        """Mark the device as seen, keeping how long it was missing."""
+        if self._missing_since is not None:
+            self._history.add((now - self._missing_since).total_seconds())
+            self._missing_since = None
+        self._observed = True
+        self._last_seen = now
+
+    def _missed(self, now: datetime) -> None:
+        """Mark a failed probe, the first one after a sighting starts an absence.
+
+        The time between sightings is not an absence, a device at home is only
+        probed again halfway through its consider_home. No absence starts
+        before the device is seen after setup, the downtime of a restart is
+        not one either.
+        """
+        if self._observed and self._missing_since is None:
+            self._missing_since = now
+
+
+@dataclass(slots=True)
+class PingStats:
+    """Datagrams sent and failed during one probe cycle."""
+
+    sent: int = 0
+    failed: int = 0
+    replied: int = 0
+
 
+def is_ipv6(ip_address: str) -> bool:
+    """Return if `ip_address` is an IPv6 address, assuming it is valid."""
+    return ":" in ip_address
 
-async def pinger(loop: asyncio.AbstractEventLoop, ip_addresses: list[str]) -> None:
-    transport, _ = await loop.create_datagram_endpoint(lambda: asyncio.DatagramProtocol(), family=socket.AF_INET)
+
+def is_neighbour_map(value: Any) -> bool:
+    """Return if `value`, decoded from JSON, maps addresses to MAC addresses."""
+    return isinstance(value, dict) and all(isinstance(lladdr, str) for lladdr in value.values())
+
+
+def is_address_list(value: Any) -> bool:
+    """Return if `value`, decoded from JSON, is a list of addresses."""
+    return isinstance(value, list) and all(isinstance(ip_address, str) for ip_address in value)
+
+
+@lru_cache(maxsize=4096)
+def _reverse_qname(ip_address: str) -> bytes:
+    """Return the reverse name of `ip_address`, in in-addr.arpa or ip6.arpa, encoded for DNS."""
+    labels = ipaddress.ip_address(ip_address).reverse_pointer.split(".")
+    return b"".join(bytes([len(label)]) + label.encode() for label in labels) + b"\0"
+
+
+@lru_cache(maxsize=4096)
+def mdns_query(ip_address: str) -> bytes:
+    """Return an mDNS query for the reverse name of `ip_address`.
+
+    Sent from an ephemeral port it is a legacy unicast query, answered directly
+    to the sender by devices owning the address.
+    """
+    # Header with one question, then QTYPE PTR and QCLASS IN
+    return struct.pack("!6H", 0, 0, 1, 0, 0, 0) + _reverse_qname(ip_address) + struct.pack("!2H", DNS_TYPE_PTR, 1)
+
+
+def mdns_multicast_queries(ip_addresses: Sequence[str]) -> list[bytes]:
+    """Return mDNS queries for the reverse names of `ip_addresses`, in as few as fit PROBE_MULTICAST_SIZE.
+
+    Questions ask for unicast responses, so only the sender gets the answers.
+    """
+    qtype = struct.pack("!2H", DNS_TYPE_PTR, DNS_CLASS_IN | DNS_UNICAST_RESPONSE)
+    queries = []
+    questions: list[bytes] = []
+    size = 12
     for ip_address in ip_addresses:
+        question = _reverse_qname(ip_address) + qtype
+        if questions and size + len(question) > PROBE_MULTICAST_SIZE:
+            queries.append(struct.pack("!6H", 0, 0, len(questions), 0, 0, 0) + b"".join(questions))
+            questions, size = [], 12
+        questions.append(question)
+        size += len(question)
+
+    if questions:
+        queries.append(struct.pack("!6H", 0, 0, len(questions), 0, 0, 0) + b"".join(questions))
+    return queries
+
+
+def _read_name(data: bytes, offset: int) -> tuple[list[bytes], int]:
+    """Return the labels of the DNS name at `offset` and the offset past it, following compression."""
+    labels = []
+    end = None
+    # Bound the jumps, a malformed message may loop
+    for _ in range(64):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = (length & 0x3F) << 8 | data[offset + 1]
+            continue
+        offset += 1
+        if not length:
+            return labels, end if end is not None else offset
+        labels.append(data[offset : offset + length].lower())
+        offset += length
+    raise ValueError("Too many compression pointers")
+
+
+def _reverse_address(labels: list[bytes]) -> str | None:
+    """Return the address a reverse name stands for, or None for other names."""
+    if len(labels) == 6 and labels[4:] == [b"in-addr", b"arpa"]:
+        return ".".join(label.decode() for label in reversed(labels[:4]))
+    if len(labels) == 34 and labels[32:] == [b"ip6", b"arpa"]:
+        return str(ipaddress.IPv6Address(int(b"".join(reversed(labels[:32])), 16)))
+    return None
+
+
+def mdns_answered_addresses(data: bytes) -> list[str]:
+    """Return the addresses whose reverse name is answered in an mDNS response."""
+    addresses = []
+    try:
+        qdcount, ancount = struct.unpack_from("!2H", data, 4)
+        offset = 12
+        for _ in range(qdcount):
+            _, offset = _read_name(data, offset)
+            offset += 4
+        for _ in range(ancount):
+            labels, offset = _read_name(data, offset)
+            rtype, _, _, rdlength = struct.unpack_from("!HHIH", data, offset)
+            offset += 10 + rdlength
+            if rtype == DNS_TYPE_PTR and (address := _reverse_address(labels)) is not None:
+                addresses.append(address)
+    except (IndexError, ValueError, struct.error) as exc:
+        _LOGGER.debug("Malformed mDNS response: %s", exc)
+
+    return addresses
+
+
+class PingProtocol(asyncio.DatagramProtocol):
+    """Collect replies and count send errors of the probe transport."""
+
+    def __init__(self, pinger: Pinger) -> None:
+        """Initialize the protocol."""
+        self._pinger = pinger
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Record an mDNS response from a probed device."""
+        # Only responses, with the QR bit set
+        if len(data) >= 12 and data[2] & 0x80:
+            if not is_ipv6(addr[0]):
+                self._pinger._reply(addr[0])
+                return
+            # Answers to multicast queries come from any of the device's addresses, the names tell which
+            for ip_address in mdns_answered_addresses(data):
+                self._pinger._reply(ip_address)
+
+    def error_received(self, exc: Exception) -> None:
+        """Count a failed datagram."""
+        self._pinger.stats.failed += 1
+        _LOGGER.debug("Failed to ping: %s", exc)
+
+
+class Pinger:
+    """Probe devices through UDP transports kept open across cycles.
+
+    Devices answering the mDNS query are known to be reachable without reading
+    the neighbour table. ICMP errors are not used, without IP_RECVERR the
+    kernel does not tell which address they came from. IPv4 addresses are
+    probed each with its own query, IPv6 addresses with multicast queries.
+    """
+
+    def __init__(self, reply_timeout: float = PROBE_REPLY_TIMEOUT, interfaces: InterfaceMap | None = None) -> None:
+        """Initialize the pinger."""
+        self.reply_timeout = reply_timeout
+        self.interfaces = interfaces or InterfaceMap()
+        self.replies: set[str] = set()
+        self.stats = PingStats()
+        self._transports: dict[str | None, asyncio.DatagramTransport] = {}
+        self._transport6: asyncio.DatagramTransport | None = None
+        self._probed: set[str] = set()
+        # Addresses still waited for and the event set once all replied, per waiter
+        self._waiters: list[tuple[set[str], asyncio.Event]] = []
+
+    async def _async_get_transport(
+        self, loop: asyncio.AbstractEventLoop, interface: str | None
+    ) -> asyncio.DatagramTransport:
+        """Return the transport sending through `interface`, opening it when needed."""
+        if (transport := self._transports.get(interface)) is not None and not transport.is_closing():
+            return transport
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if interface is not None and hasattr(socket, "SO_BINDTODEVICE"):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+            except OSError as exc:
+                _LOGGER.debug("Unable to bind probe socket to %s, using the routing table: %s", interface, exc)
+
+        transport, _ = await loop.create_datagram_endpoint(lambda: PingProtocol(self), sock=sock)
+        self._transports[interface] = transport
+        return transport
+
+    async def _async_get_transport6(self, loop: asyncio.AbstractEventLoop) -> asyncio.DatagramTransport:
+        """Return the transport sending multicast queries, opening it when needed."""
+        if self._transport6 is not None and not self._transport6.is_closing():
+            return self._transport6
+
+        sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        # mDNS ignores packets from beyond the link
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, 255)
+        self._transport6, _ = await loop.create_datagram_endpoint(lambda: PingProtocol(self), sock=sock)
+        return self._transport6
+
+    async def async_ping_multicast(self, loop: asyncio.AbstractEventLoop, ip_addresses: Sequence[str]) -> None:
+        """Ask for the reverse names of IPv6 addresses with multicast queries to PROBE_GROUP6.
+
+        One query per interface asks for all its addresses, split only when
+        larger than PROBE_MULTICAST_SIZE. Call after `async_ping`, which resets
+        the replies of the cycle.
+        """
+        self._probed.update(ip_addresses)
         try:
-            transport.sendto(b"ping", (ip_address, 5353))
-        except Exception as e:
-            _LOGGER.error(f"Failed to ping {ip_address}", e)
+            transport = await self._async_get_transport6(loop)
+        except OSError as exc:
+            _LOGGER.debug("Unable to probe over IPv6: %s", exc)
+            self.stats.failed += len(ip_addresses)
+            return
+        for interface, addresses in self.interfaces.group(ip_addresses).items():
+            try:
+                # The group is link local, the interface is given as scope
+                scope_id = socket.if_nametoindex(interface) if interface is not None else 0
+            except OSError as exc:
+                _LOGGER.debug("Unable to probe on %s: %s", interface, exc)
+                continue
+            for query in mdns_multicast_queries(addresses):
+                transport.sendto(query, (PROBE_GROUP6, PROBE_PORT, 0, scope_id))
+                self.stats.sent += 1
+
+    async def async_ping(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        ip_addresses: Sequence[str],
+        bucket: TokenBucket | None = None,
+    ) -> AsyncIterator[list[str]]:
+        """Send a probe to every address through its interface, yielding each batch once sent.
+
+        With a `bucket` the batches are paced to its rate, each waiting for at
+        least PROBE_PACE_TICK worth of tokens. Without, batches of
+        PROBE_CHUNK_SIZE are sent at once, yielding to the loop in between.
+        """
+        stats = self.stats = PingStats()
+        self.replies = set()
+        self._probed = set(ip_addresses)
+        tick = max(1, int(bucket.rate * PROBE_PACE_TICK)) if bucket is not None else PROBE_CHUNK_SIZE
+        for interface, addresses in self.interfaces.group(ip_addresses).items():
+            transport = await self._async_get_transport(loop, interface)
+            start = 0
+            while start < len(addresses):
+                size = min(len(addresses) - start, PROBE_CHUNK_SIZE)
+                if bucket is None:
+                    if start:
+                        await asyncio.sleep(0)
+                else:
+                    while (delay := bucket.delay(min(size, tick), loop.time())) > 0:
+                        await asyncio.sleep(delay)
+                    size = bucket.take(size, loop.time())
+
+                batch = addresses[start : start + size]
+                for ip_address in batch:
+                    # Send errors are reported to PingProtocol.error_received
+                    transport.sendto(mdns_query(ip_address), (ip_address, PROBE_PORT))
+                    stats.sent += 1
+                start += size
+                yield batch
 
-    transport.close()
+    def _reply(self, ip_address: str) -> None:
+        """Record a reply from a probed address."""
+        if ip_address not in self._probed or ip_address in self.replies:
+            return
+        self.replies.add(ip_address)
+        self.stats.replied += 1
+        for waiting, event in self._waiters:
+            waiting.discard(ip_address)
+            if not waiting:
+                event.set()
+
+    async def async_wait_replies(self, ip_addresses: Sequence[str] | None = None) -> set[str]:
+        """Wait up to `reply_timeout` for the addresses to reply, and return those that did.
+
+        Without `ip_addresses` all addresses probed this cycle are waited for.
+        """
+        expected = self._probed if ip_addresses is None else set(ip_addresses)
+        if self.reply_timeout and (waiting := expected - self.replies):
+            waiter = (waiting, asyncio.Event())
+            self._waiters.append(waiter)
+            try:
+                with suppress(TimeoutError):
+                    async with asyncio.timeout(self.reply_timeout):
+                        await waiter[1].wait()
+            finally:
+                self._waiters.remove(waiter)
+        return self.replies & expected
+
+    def close(self) -> None:
+        """Close the probe transports."""
+        for transport in self._transports.values():
+            transport.close()
+        self._transports.clear()
+        if self._transport6 is not None:
+            self._transport6.close()
+            self._transport6 = None
 
 
 async def get_arp_subprocess(cmd: Sequence) -> list[str]:
@@ -61,99 +410,1029 @@ async def get_arp_subprocess(cmd: Sequence) -> list[str]:
     return response
 
 
+class TableSizes:
+    """Reachable neighbours counted by the last reads of whole tables, per family and interface.
+
+    A read limited to an interface counts that interface, one that is not
+    counts all of them and replaces the counts per interface. Scanners that
+    only look up tracked addresses forget the count of that family.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without counts."""
+        self._sizes: dict[int, dict[str | None, int]] = {}
+
+    def update(self, family: int, interface: str | None, size: int) -> None:
+        """Record the size of a table read."""
+        sizes = self._sizes.setdefault(family, {})
+        if interface is None:
+            sizes.clear()
+        else:
+            sizes.pop(None, None)
+        sizes[interface] = size
+
+    def forget(self, family: int) -> None:
+        """Drop the counts of a family no longer read whole."""
+        self._sizes.pop(family, None)
+
+    @property
+    def total(self) -> int | None:
+        """Return the counts of all families, None while the IPv4 table was not read."""
+        if socket.AF_INET not in self._sizes:
+            return None
+        return sum(sum(sizes.values()) for sizes in self._sizes.values())
+
+
 class ScannerException(Exception):
     """Scanner exception."""
 
 
 class Scanner(Protocol):
-    """Scanner class for getting ARP cache records."""
+    """Scanner class for getting ARP cache records.
+
+    `targeted` scanners look up a few addresses for less than reading the whole
+    table, and are asked once per batch of probes instead of once per cycle.
+    """
+
+    targeted: bool = False
+
+    @property
+    def table_size(self) -> int | None:
+        """Return the reachable neighbours in the table at the last read, None when not known."""
+        return None
+
+    async def get_arp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable by the network, with their MAC address.
 
-    async def get_arp_records(self, hass: HomeAssistant) -> list[str]:
-        """Return list of IPv4 devices reachable by the network."""
-        return []
+        Scanners may limit the lookup to `ip_addresses` and to neighbours on
+        `interface`, when given. With `reachable` unset every neighbour with a
+        known MAC address is returned, used to find devices tracked by MAC.
+        """
+        return {}
+
+
+@runtime_checkable
+class PushScanner(Scanner, Protocol):
+    """Scanner receiving neighbour changes as they happen."""
+
+    async def async_start(
+        self,
+        hass: HomeAssistant,
+        devices: dict[str, DeviceData],
+        on_update: Callable[[str], None],
+    ) -> None:
+        """Start listening for neighbour changes of tracked devices."""
+
+    async def async_stop(self) -> None:
+        """Stop listening for neighbour changes."""
+
+
+@runtime_checkable
+class NeighbourDiscoveryScanner(Scanner, Protocol):
+    """Scanner also reading the IPv6 neighbour table, filled by neighbour discovery."""
+
+    async def get_ndp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+    ) -> dict[str, str]:
+        """Return IPv6 neighbours reachable by the network, with their MAC address.
+
+        Scanners may limit the lookup to `ip_addresses` and to neighbours on
+        `interface`, when given, like `get_arp_records`.
+        """
+        return {}
 
 
 class ScannerIPRoute:
-    """Get ARP cache records using pyroute2."""
+    """Get ARP cache records using pyroute2.
+
+    Without `ip_addresses` the whole neighbour table is dumped, which costs one
+    message per table entry. With `ip_addresses` each tracked address is looked
+    up on its own, which costs one request per tracked address regardless of the
+    table size, plus a route lookup the first time an address is seen.
+
+    Before each lookup the kernel is asked to revalidate the neighbour with
+    NTF_USE, in the same netlink session, so entries that are stale or missing
+    are resolved for the next cycle. This needs CAP_NET_ADMIN and is turned off
+    when not permitted.
+
+    The IPv6 neighbour table is always dumped whole, in a session of its own,
+    as it is read at most once per cycle. Per address lookups and revalidation
+    are IPv4 only.
+    """
+
+    targeted = True
+
+    def __init__(self) -> None:
+        """Initialize the scanner."""
+        self._ifindex: dict[str, int] = {}
+        self._revalidate = True
+        self._sizes = TableSizes()
 
-    def _get_arp_records(self) -> list[str]:
-        """Return list of IPv4 devices reachable by the network."""
-        response = []
+    @property
+    def table_size(self) -> int | None:
+        """Return the reachable neighbours at the last dump, None when only tracked addresses were looked up."""
+        return self._sizes.total
+
+    def _get_arp_records(
+        self,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+        family: int = socket.AF_INET,
+    ) -> dict[str, str]:
+        """Return devices of `family` reachable by the network, with their MAC address."""
+        response = {}
+        states = NUD_REACHABLE if reachable else NUD_LLADDR_KNOWN
         try:
+            # pyroute2 is only imported once this scanner is used
+            from pyroute2 import IPRoute
+
+            ifindex = socket.if_nametoindex(interface) if interface is not None else None
             with closing(IPRoute()) as ipr:
-                result = ipr.get_neighbours(family=socket.AF_INET, match=lambda x: x["state"] == 2)
-            response = [dev["attrs"][0][1] for dev in result]
+                if ip_addresses is None:
+                    result = ipr.get_neighbours(
+                        family=family,
+                        match=lambda x: x["state"] & states and ifindex in (None, x["ifindex"]),
+                    )
+                    response = {dev.get("NDA_DST"): lladdr for dev in result if (lladdr := dev.get("NDA_LLADDR"))}
+                    if reachable:
+                        self._sizes.update(family, interface, len(response))
+                else:
+                    response = self._lookup_neighbours(ipr, ip_addresses, ifindex, states)
+                    self._sizes.forget(family)
         except Exception as exc:
             _LOGGER.debug("Exception on ARP lookup: %s", exc)
 
         return response
 
-    async def get_arp_records(self, hass: HomeAssistant) -> list[str]:
-        """Return list of IPv4 devices reachable by the network."""
-        response = await hass.async_add_executor_job(self._get_arp_records)
+    def _lookup_neighbours(
+        self,
+        ipr: IPRoute,
+        ip_addresses: Sequence[str],
+        interface_index: int | None = None,
+        states: int = NUD_REACHABLE,
+    ) -> dict[str, str]:
+        """Return addresses in one of `states` and their MAC, asking the kernel for each address only.
+
+        Without `interface_index` the interface is looked up from the route to
+        each address. Addresses routed through a gateway are off-link and have
+        no neighbour entry, they are skipped so none is created for them.
+        """
+        from pyroute2.netlink.exceptions import NetlinkError
+
+        response = {}
+        requests = 0
+        for ip_address in ip_addresses:
+            try:
+                if (ifindex := interface_index or self._ifindex.get(ip_address)) is None:
+                    requests += 1
+                    route = ipr.route("get", dst=ip_address)
+                    if route[0].get("RTA_GATEWAY") is not None:
+                        continue
+                    ifindex = self._ifindex[ip_address] = route[0].get("RTA_OIF")
+
+                if self._revalidate:
+                    requests += 1
+                    self._revalidate_neighbour(ipr, ip_address, ifindex)
+
+                requests += 1
+                result = ipr.neigh("get", dst=ip_address, ifindex=ifindex)
+            except NetlinkError as exc:
+                # Forget the interface in case the route changed, which shows as a missing neighbour too
+                self._ifindex.pop(ip_address, None)
+                if exc.code != errno.ENOENT:
+                    _LOGGER.debug("Exception on neighbour lookup for %s: %s", ip_address, exc)
+                continue
+
+            for dev in result:
+                if dev["state"] & states and (lladdr := dev.get("NDA_LLADDR")):
+                    response[ip_address] = lladdr
+
+        _LOGGER.debug("Looked up %d tracked neighbours with %d requests", len(ip_addresses), requests)
+        return response
+
+    def _revalidate_neighbour(self, ipr: IPRoute, ip_address: str, ifindex: int) -> None:
+        """Ask the kernel to resolve the neighbour, creating the entry when missing.
+
+        Best effort, the lookup runs whether this worked or not. Links without
+        neighbour resolution, e.g. NOARP or tunnels, refuse it for their
+        neighbours only.
+        """
+        from pyroute2.netlink.exceptions import NetlinkError
+
+        try:
+            # The state is ignored with NTF_USE, but pyroute2 defaults to permanent
+            ipr.neigh("replace", dst=ip_address, ifindex=ifindex, state=NUD_NONE, flags=NTF_USE)
+        except NetlinkError as exc:
+            if exc.code == errno.EPERM:
+                _LOGGER.debug("Not permitted to revalidate neighbours, only looking them up")
+                self._revalidate = False
+            else:
+                _LOGGER.debug("Unable to revalidate neighbour %s: %s", ip_address, exc)
+
+    async def get_arp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable by the network, with their MAC address."""
+        response = await hass.async_add_executor_job(self._get_arp_records, ip_addresses, interface, reachable)
+        return response
+
+    async def get_ndp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+    ) -> dict[str, str]:
+        """Return IPv6 neighbours reachable by the network, with their MAC address.
+
+        The whole table is dumped, `ip_addresses` is not used.
+        """
+        response = await hass.async_add_executor_job(self._get_arp_records, None, interface, True, socket.AF_INET6)
         return response
 
 
+class NeighbourListener(ABC):
+    """Keep reachable neighbours up to date from events instead of polling.
+
+    Subclasses implement `_async_listen`, which seeds `_neighbours` and
+    `_neighbours6` and feeds events to `_apply` until cancelled, and inherit
+    from a polling scanner used as fallback when the listener is not running.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the listener."""
+        super().__init__()
+        self._neighbours: dict[str, str] = {}
+        self._neighbours6: dict[str, str] = {}
+        self._devices: dict[str, DeviceData] = {}
+        self._on_update: Callable[[str], None] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def async_start(
+        self,
+        hass: HomeAssistant,
+        devices: dict[str, DeviceData],
+        on_update: Callable[[str], None],
+    ) -> None:
+        """Start listening for neighbour changes of tracked devices."""
+        self._devices = devices
+        self._on_update = on_update
+        self._task = hass.async_create_background_task(self._async_run(hass), "iphonedetect_neighbour_listener")
+
+    async def async_stop(self) -> None:
+        """Stop listening for neighbour changes."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def targeted(self) -> bool:
+        """Return if lookups are cheap, as they are while listening."""
+        return self._task is not None or super().targeted  # type: ignore[misc]
+
+    @property
+    def table_size(self) -> int | None:
+        """Return the reachable neighbours kept, or counted by the polling scanner when not listening."""
+        if self._task is None:
+            return super().table_size  # type: ignore[misc]
+        return len(self._neighbours) + len(self._neighbours6)
+
+    async def _async_run(self, hass: HomeAssistant) -> None:
+        """Run the listener, falling back to polling when it fails."""
+        try:
+            await self._async_listen(hass)
+        except Exception as exc:
+            _LOGGER.warning("Neighbour listener stopped, falling back to polling: %s", exc)
+            self._task = None
+
+    @abstractmethod
+    async def _async_listen(self, hass: HomeAssistant) -> None:
+        """Follow neighbour events until cancelled."""
+
+    def _apply(self, ip_address: str, lladdr: str | None) -> None:
+        """Apply a neighbour change to the tracked devices, `lladdr` is None when not reachable."""
+        reachable = lladdr is not None
+        neighbours = self._neighbours6 if is_ipv6(ip_address) else self._neighbours
+        was_reachable = ip_address in neighbours
+        if reachable:
+            neighbours[ip_address] = lladdr
+        else:
+            neighbours.pop(ip_address, None)
+        if reachable == was_reachable:
+            return
+
+        for entry_id, device in self._devices.items():
+            if device.ip_address != ip_address:
+                continue
+            _LOGGER.debug("Device '%s' (%s) reachable changed to %s", device.title, ip_address, reachable)
+            device._reachable = reachable
+            if reachable:
+                from homeassistant.util import dt as dt_util
+
+                device._seen(dt_util.utcnow())
+            if self._on_update is not None:
+                self._on_update(entry_id)
+
+    async def get_arp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable by the network, with their MAC address."""
+        if self._task is None or not reachable:
+            return await super().get_arp_records(hass, ip_addresses, interface, reachable)  # type: ignore[misc]
+        if ip_addresses is None:
+            return dict(self._neighbours)
+        return {ip_address: self._neighbours[ip_address] for ip_address in ip_addresses if ip_address in self._neighbours}
+
+    async def get_ndp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+    ) -> dict[str, str]:
+        """Return IPv6 neighbours reachable by the network, with their MAC address."""
+        if self._task is None:
+            return await super().get_ndp_records(hass, ip_addresses, interface)  # type: ignore[misc]
+        if ip_addresses is None:
+            return dict(self._neighbours6)
+        return {
+            ip_address: self._neighbours6[ip_address] for ip_address in ip_addresses if ip_address in self._neighbours6
+        }
+
+
+class ScannerIPRouteListener(NeighbourListener, ScannerIPRoute):
+    """Get ARP cache records from pyroute2 neighbour events."""
+
+    async def _async_listen(self, hass: HomeAssistant) -> None:
+        """Follow neighbour events until cancelled."""
+        await hass.async_add_import_executor_job(importlib.import_module, "pyroute2")
+        from pyroute2 import AsyncIPRoute
+        from pyroute2.netlink.rtnl import RTMGRP_NEIGH
+
+        async with AsyncIPRoute() as ipr:
+            await ipr.bind(groups=RTMGRP_NEIGH)
+            # Seed after binding, events arriving meanwhile are queued on the socket
+            self._neighbours = await ScannerIPRoute.get_arp_records(self, hass)
+            self._neighbours6 = await ScannerIPRoute.get_ndp_records(self, hass)
+            _LOGGER.debug(
+                "Listening for neighbour events, %d reachable, %d over IPv6",
+                len(self._neighbours),
+                len(self._neighbours6),
+            )
+            while True:
+                async for msg in ipr.get():
+                    self._handle_message(msg)
+
+    def _handle_message(self, msg) -> None:
+        """Apply a netlink neighbour message."""
+        if msg["family"] not in (socket.AF_INET, socket.AF_INET6) or (ip_address := msg.get("NDA_DST")) is None:
+            return
+
+        reachable = msg["event"] == "RTM_NEWNEIGH" and msg["state"] == NUD_REACHABLE
+        self._apply(ip_address, msg.get("NDA_LLADDR") or "" if reachable else None)
+
+
 class ScannerIPNeigh:
     """Get ARP cache records using subprocess."""
 
-    async def get_arp_records(self, hass: HomeAssistant = None) -> list[str]:
-        """Return list of IPv4 devices reachable by the network."""
-        response = []
-        result = await get_arp_subprocess(CMD_IP_NEIGH.split())
-        if result:
-            response = [row.split()[0] for row in result if row.count(":") == 5]
+    targeted = False
+
+    def __init__(self) -> None:
+        """Initialize the scanner."""
+        super().__init__()
+        self._sizes = TableSizes()
 
+    @property
+    def table_size(self) -> int | None:
+        """Return the reachable neighbours printed by the last commands."""
+        return self._sizes.total
+
+    async def get_arp_records(
+        self,
+        hass: HomeAssistant = None,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable by the network, with their MAC address."""
+        response = await self._get_records((CMD_IP_NEIGH if reachable else CMD_IP_NEIGH_ALL).split(), interface)
+        if reachable:
+            self._sizes.update(socket.AF_INET, interface, len(response))
         return response
 
+    async def get_ndp_records(
+        self,
+        hass: HomeAssistant = None,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+    ) -> dict[str, str]:
+        """Return IPv6 neighbours reachable by the network, with their MAC address."""
+        response = await self._get_records(CMD_IP6_NEIGH.split(), interface)
+        self._sizes.update(socket.AF_INET6, interface, len(response))
+        return response
+
+    @staticmethod
+    async def _get_records(cmd: list[str], interface: str | None) -> dict[str, str]:
+        """Return the neighbours printed by `cmd`, with their MAC address."""
+        response = {}
+        if interface is not None:
+            cmd += ["dev", interface]
+        result = await get_arp_subprocess(cmd)
+        # e.g. "192.168.1.5 dev eth0 lladdr aa:bb:cc:dd:ee:ff REACHABLE", IPv6 neighbours may add "router"
+        for row in result:
+            fields = row.split()
+            if "lladdr" in fields:
+                response[fields[0]] = fields[fields.index("lladdr") + 1]
+
+        return response
+
+
+class ScannerIPNeighMonitor(NeighbourListener, ScannerIPNeigh):
+    """Get ARP cache records from a long running `ip monitor neigh` process."""
+
+    async def _async_listen(self, hass: HomeAssistant) -> None:
+        """Follow neighbour events, restarting the monitor when it exits."""
+        backoff = MONITOR_BACKOFF_MIN
+        while True:
+            started = hass.loop.time()
+            try:
+                await self._async_monitor(hass)
+            except OSError as exc:
+                _LOGGER.debug("Exception on neighbour monitor: %s", exc)
+
+            if hass.loop.time() - started > MONITOR_BACKOFF_MAX:
+                backoff = MONITOR_BACKOFF_MIN
+            _LOGGER.debug("Neighbour monitor exited, restarting in %ss", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MONITOR_BACKOFF_MAX)
+
+    async def _async_monitor(self, hass: HomeAssistant) -> None:
+        """Run the monitor until it exits."""
+        proc = await asyncio.create_subprocess_exec(
+            *CMD_IP_MONITOR.split(),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            close_fds=False,
+        )
+        try:
+            # Seed after starting, events arriving meanwhile are buffered in the pipe
+            self._neighbours = await ScannerIPNeigh.get_arp_records(self, hass)
+            self._neighbours6 = await ScannerIPNeigh.get_ndp_records(self, hass)
+            _LOGGER.debug(
+                "Monitoring neighbours, %d reachable, %d over IPv6", len(self._neighbours), len(self._neighbours6)
+            )
+            assert proc.stdout is not None
+            while line := await proc.stdout.readline():
+                self._handle_line(line.decode())
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+    def _handle_line(self, line: str) -> None:
+        """Apply a line printed by `ip monitor neigh`."""
+        # e.g. "192.168.1.5 dev eth0 lladdr aa:bb:cc:dd:ee:ff REACHABLE" or "Deleted 192.168.1.5 dev eth0 ..."
+        fields = line.split()
+        if len(fields) < 2:
+            return
+
+        deleted = fields[0] == "Deleted"
+        if fields[0] in ("Deleted", "miss"):
+            fields = fields[1:]
+
+        if deleted or fields[-1] != "REACHABLE":
+            self._apply(fields[0], None)
+        else:
+            self._apply(fields[0], fields[fields.index("lladdr") + 1] if "lladdr" in fields else "")
+
 
 class ScannerArp:
     """Get ARP cache records using subprocess."""
 
-    async def get_arp_records(self, hass: HomeAssistant = None) -> list[str]:
-        """Return list of IPv4 devices reachable by the network."""
-        response = []
-        result = await get_arp_subprocess(CMD_ARP.split())
-        if result:
-            response = [row.split()[0] for row in result if row.count(":") == 5]
+    targeted = False
+
+    def __init__(self) -> None:
+        """Initialize the scanner."""
+        self._sizes = TableSizes()
+
+    @property
+    def table_size(self) -> int | None:
+        """Return the neighbours with a MAC address printed by the last commands."""
+        return self._sizes.total
+
+    async def get_arp_records(
+        self,
+        hass: HomeAssistant = None,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable by the network, with their MAC address."""
+        response = {}
+        cmd = CMD_ARP.split()
+        if interface is not None:
+            cmd += ["-i", interface]
+        result = await get_arp_subprocess(cmd)
+        # Columns: Address, HWtype, HWaddress, Flags, Mask, Iface
+        for row in result:
+            if row.count(":") == 5:
+                fields = row.split()
+                response[fields[0]] = fields[2]
+
+        self._sizes.update(socket.AF_INET, interface, len(response))
+        return response
+
+
+class ScannerProcNetArp:
+    """Get ARP cache records by reading the kernel ARP table file."""
+
+    targeted = False
+
+    def __init__(self, path: str = PROC_NET_ARP) -> None:
+        """Initialize the scanner."""
+        self._path = path
+        self._sizes = TableSizes()
+
+    @property
+    def table_size(self) -> int | None:
+        """Return the completed entries at the last read."""
+        return self._sizes.total
+
+    def _get_arp_records(
+        self, ip_addresses: Sequence[str] | None = None, interface: str | None = None, reachable: bool = True
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable by the network, with their MAC address.
+
+        The file has no neighbour state, completed entries are taken as reachable.
+        Every completed entry is counted for the table size, tracked or not.
+        """
+        try:
+            with open(self._path, "rb") as file:
+                data = file.read()
+        except OSError as exc:
+            _LOGGER.debug("Exception on ARP lookup: %s", exc)
+            return {}
+
+        tracked = None if ip_addresses is None else {ip_address.encode() for ip_address in ip_addresses}
+        device = None if interface is None else interface.encode()
+        response = {}
+        completed = 0
+        # Columns: IP address, HW type, Flags, HW address, Mask, Device
+        for row in data.splitlines()[1:]:
+            if device is not None and row.rsplit(maxsplit=1)[-1] != device:
+                continue
+            ip_address, _, flags, rest = row.split(maxsplit=3)
+            if not int(flags, 16) & ATF_COM:
+                continue
+            completed += 1
+            if tracked is None or ip_address in tracked:
+                response[ip_address.decode()] = rest[: rest.find(b" ")].decode()
+
+        if reachable:
+            self._sizes.update(socket.AF_INET, interface, completed)
+        return response
+
+    async def get_arp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable by the network, with their MAC address."""
+        response = await hass.async_add_executor_job(self._get_arp_records, ip_addresses, interface, reachable)
+        return response
+
+
+class ScannerRemote(NeighbourListener):
+    """Get ARP cache records from an agent on a host attached to the devices' network.
 
+    The agent, see agent.py, sends its reachable neighbours on connect and then
+    only the changes, one JSON object per line. The connection is reopened with
+    a backoff when lost, and the neighbours sent on reconnect replace the ones
+    kept meanwhile. Nothing is returned while disconnected, so devices expire
+    after their consider_home instead of staying home.
+
+    Addresses looked up and not found are sent to the agent to probe from its
+    side, the result follows as a change. Only reachable neighbours are sent,
+    devices tracked by MAC are followed among those. IPv6 neighbours are sent
+    by agents reading the IPv6 neighbour table too.
+    """
+
+    targeted = True
+
+    def __init__(self, host: str, port: int = DEFAULT_AGENT_PORT) -> None:
+        """Initialize the scanner."""
+        super().__init__()
+        self.host = host
+        self.port = port
+        self._writer: asyncio.StreamWriter | None = None
+
+    @property
+    def table_size(self) -> int | None:
+        """Return the reachable neighbours sent by the agent, None while disconnected."""
+        if self._writer is None:
+            return None
+        return len(self._neighbours) + len(self._neighbours6)
+
+    async def _async_listen(self, hass: HomeAssistant) -> None:
+        """Follow the agent, reconnecting when the connection is lost."""
+        backoff = MONITOR_BACKOFF_MIN
+        while True:
+            started = hass.loop.time()
+            try:
+                await self._async_follow()
+            except (OSError, TimeoutError, ValueError) as exc:
+                _LOGGER.debug("Exception on agent connection: %s", exc)
+
+            if hass.loop.time() - started > MONITOR_BACKOFF_MAX:
+                backoff = MONITOR_BACKOFF_MIN
+            _LOGGER.debug("Agent %s:%s disconnected, reconnecting in %ss", self.host, self.port, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MONITOR_BACKOFF_MAX)
+
+    async def _async_follow(self) -> None:
+        """Apply the messages of one connection until it is closed."""
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=AGENT_LINE_LIMIT)
+        self._writer = writer
+        try:
+            while True:
+                # The agent sends a heartbeat when idle, a silent connection is dead
+                async with asyncio.timeout(AGENT_HEARTBEAT * 3):
+                    line = await reader.readline()
+                if not line:
+                    return
+                self._handle_message(json.loads(line))
+        finally:
+            self._writer = None
+            writer.close()
+
+    def _handle_message(self, message: Any) -> None:
+        """Apply the neighbours or the changes sent by the agent.
+
+        Raises ValueError, dropping the connection, when the message is not
+        shaped as expected, before anything is applied.
+        """
+        if not isinstance(message, dict):
+            raise ValueError(f"Unexpected message from agent: {message!r:.100}")
+
+        if "snapshot" in message:
+            if not is_neighbour_map(neighbours := message["snapshot"]):
+                raise ValueError("Unexpected snapshot from agent")
+            _LOGGER.debug("Agent %s:%s has %d reachable neighbours", self.host, self.port, len(neighbours))
+            for table in (self._neighbours, self._neighbours6):
+                for ip_address in [ip_address for ip_address in table if ip_address not in neighbours]:
+                    self._apply(ip_address, None)
+            for ip_address, lladdr in neighbours.items():
+                self._apply(ip_address, lladdr)
+            return
+
+        up = message.get("up", {})
+        down = message.get("down", [])
+        if not is_neighbour_map(up) or not is_address_list(down):
+            raise ValueError("Unexpected changes from agent")
+        for ip_address, lladdr in up.items():
+            self._apply(ip_address, lladdr)
+        for ip_address in down:
+            self._apply(ip_address, None)
+
+    async def get_arp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+        reachable: bool = True,
+    ) -> dict[str, str]:
+        """Return IPv4 devices reachable from the agent, with their MAC address."""
+        if self._writer is None:
+            return {}
+        return self._lookup(self._neighbours, ip_addresses)
+
+    def _lookup(self, neighbours: dict[str, str], ip_addresses: Sequence[str] | None) -> dict[str, str]:
+        """Return `ip_addresses` found in `neighbours`, asking the agent to probe the others."""
+        if ip_addresses is None:
+            return dict(neighbours)
+
+        response = {ip_address: neighbours[ip_address] for ip_address in ip_addresses if ip_address in neighbours}
+        if missing := [ip_address for ip_address in ip_addresses if ip_address not in response]:
+            self._writer.write(json.dumps({"probe": missing}, separators=(",", ":")).encode() + b"\n")
         return response
 
+    async def get_ndp_records(
+        self,
+        hass: HomeAssistant,
+        ip_addresses: Sequence[str] | None = None,
+        interface: str | None = None,
+    ) -> dict[str, str]:
+        """Return IPv6 neighbours reachable from the agent, with their MAC address."""
+        if self._writer is None:
+            return {}
+        return self._lookup(self._neighbours6, ip_addresses)
+
+
+async def async_update_devices(
+    hass: HomeAssistant,
+    scanner: Scanner,
+    pinger: Pinger,
+    scheduler: ProbeScheduler,
+    devices: dict[str, DeviceData],
+) -> CycleSample | None:
+    """Update reachability for tracked devices due for a probe, and return the cycle timings."""
+    from homeassistant.util import dt as dt_util
+
+    now = dt_util.utcnow()
+    probe = {entry_id: devices[entry_id] for entry_id in scheduler.due(devices, now)}
+    if not probe:
+        _LOGGER.debug("No devices due for probing")
+        return None
 
-async def async_update_devices(hass: HomeAssistant, scanner: Scanner, devices: dict[str, DeviceData]) -> None:
-    """Update reachability for all tracked devices."""
-    ip_addresses = [device.ip_address for device in devices.values()]
+    ip_addresses = [device.ip_address for device in probe.values()]
+    sample = CycleSample(probes=len(ip_addresses))
+    # IPv6 addresses are probed with multicast queries and looked up in the NDP table
+    ip6_addresses = [ip_address for ip_address in ip_addresses if is_ipv6(ip_address)]
+    if ip6_addresses:
+        ip_addresses = [ip_address for ip_address in ip_addresses if not is_ipv6(ip_address)]
 
-    # Ping devices
+    if await pinger.interfaces.async_refresh(hass):
+        # Reopen probe sockets on the current interfaces
+        pinger.close()
+
+    # A reply does not tell which device answered, devices tracked by MAC are always looked up
+    verify = {device.ip_address for device in probe.values() if device.track_mac and device.mac_address}
+
+    # Ping devices paced by the scheduler, targeted scanners check each batch
+    # once its replies are due, others check all devices after the last batch
     _LOGGER.debug("Pinging devices: %s", ip_addresses)
-    await pinger(hass.loop, ip_addresses)
+    checks = []
+    start = hass.loop.time()
+    async for batch in pinger.async_ping(hass.loop, ip_addresses, scheduler.bucket):
+        if scanner.targeted:
+            checks.append(
+                hass.async_create_task(
+                    async_check_probes(hass, scanner, pinger, batch, verify, sample), "iphonedetect_check_probes"
+                )
+            )
+    if ip6_addresses:
+        await pinger.async_ping_multicast(hass.loop, ip6_addresses)
+        checks.append(async_check_multicast(pinger, ip6_addresses, verify, sample))
+    sample.probe_time = hass.loop.time() - start
+    if not scanner.targeted and ip_addresses:
+        checks.append(async_check_probes(hass, scanner, pinger, ip_addresses, verify, sample))
 
-    # Get devices found in ARP
-    _LOGGER.debug("Fetching ARP records with %s", scanner.__class__.__name__)
-    arp_records = await scanner.get_arp_records(hass)
-    _LOGGER.debug("ARP response has %d records", len(arp_records))
+    reachable_ip: set[str] = set()
+    arp_records: dict[str, str] = {}
+    for reachable, records in await asyncio.gather(*checks):
+        reachable_ip |= reachable
+        arp_records |= records
+    _LOGGER.debug(
+        "Sent %d pings in %d checks, %d failed, %d replied, ARP response has %d records",
+        pinger.stats.sent,
+        len(checks),
+        pinger.stats.failed,
+        sample.replies,
+        len(arp_records),
+    )
 
-    # Only keep reachable tracked devices
-    reachable_ip = set(ip_addresses).intersection(arp_records)
-    _LOGGER.debug("Matched %d tracked devices: %s", len(reachable_ip), reachable_ip)
+    ndp_records, ndp_macs = await async_check_ndp(hass, scanner, probe, ip6_addresses, reachable_ip, sample)
+    reachable_ip.update(ndp_records)
+    arp_records |= ndp_records
 
-    # Update reachable devices
-    for device in devices.values():
+    # Update probed devices
+    lost: dict[str, DeviceData] = {}
+    for entry_id, device in probe.items():
         device._reachable = device.ip_address in reachable_ip
+        moved = False
+        if (mac_address := arp_records.get(device.ip_address)) is not None:
+            if not device.track_mac or device.mac_address is None:
+                device.mac_address = mac_address
+            elif mac_address != device.mac_address:
+                _LOGGER.debug("Address %s of '%s' is used by %s", device.ip_address, device.title, mac_address)
+                device._reachable = False
+                moved = True
+
+        if not device._reachable and device.track_mac and device.mac_address in ndp_macs:
+            _LOGGER.debug("Device '%s' (%s) seen over IPv6", device.title, device.mac_address)
+            device._reachable = True
+
         if device._reachable:
-            device._last_seen = dt_util.utcnow()
+            sample.matches += 1
+            device._seen(dt_util.utcnow())
+        else:
+            device._missed(dt_util.utcnow())
+        if (moved or not device._reachable) and device.track_mac and device.mac_address:
+            lost[entry_id] = device
+        scheduler.update(entry_id, device, now)
+
+    sample.records = scanner.table_size
+    _LOGGER.debug("Matched %d tracked devices, %s neighbours in the table", sample.matches, sample.records)
+
+    if lost:
+        await async_follow_devices(hass, scanner, scheduler, devices, lost)
+
+    return sample
+
+
+async def async_check_probes(
+    hass: HomeAssistant,
+    scanner: Scanner,
+    pinger: Pinger,
+    ip_addresses: Sequence[str],
+    verify: set[str],
+    sample: CycleSample,
+) -> tuple[set[str], dict[str, str]]:
+    """Wait for the replies to probes of `ip_addresses`, then look up the rest in ARP.
+
+    Addresses in `verify` are looked up even when they replied. Return the
+    reachable addresses and the ARP records found, and add to the `sample`.
+    """
+    replies = await pinger.async_wait_replies(ip_addresses)
+    sample.replies += len(replies)
+    reachable_ip = replies - verify
+
+    # Only devices that did not reply are looked up in ARP, each interface on its own
+    arp_records: dict[str, str] = {}
+    if pending := [ip_address for ip_address in ip_addresses if ip_address not in reachable_ip]:
+        groups = pinger.interfaces.group(pending)
+        _LOGGER.debug("Fetching ARP records with %s on %s", scanner.__class__.__name__, list(groups))
+        start = hass.loop.time()
+        results = await asyncio.gather(
+            *(scanner.get_arp_records(hass, addresses, interface) for interface, addresses in groups.items())
+        )
+        for result in results:
+            arp_records.update(result)
+        sample.fetch_time = max(sample.fetch_time, hass.loop.time() - start)
+
+        # Only keep reachable tracked devices
+        reachable_ip.update(ip_address for ip_address in pending if ip_address in arp_records)
+
+    return reachable_ip, arp_records
+
+
+async def async_check_multicast(
+    pinger: Pinger,
+    ip_addresses: Sequence[str],
+    verify: set[str],
+    sample: CycleSample,
+) -> tuple[set[str], dict[str, str]]:
+    """Wait for the answers to the multicast probes of IPv6 `ip_addresses`.
+
+    The others are looked up afterwards by async_check_ndp, in the same read
+    of the IPv6 neighbour table as devices followed by MAC.
+    """
+    replies = await pinger.async_wait_replies(ip_addresses)
+    sample.replies += len(replies)
+    return replies - verify, {}
+
+
+async def async_check_ndp(
+    hass: HomeAssistant,
+    scanner: Scanner,
+    probe: dict[str, DeviceData],
+    ip6_addresses: Sequence[str],
+    reachable_ip: set[str],
+    sample: CycleSample,
+) -> tuple[dict[str, str], set[str]]:
+    """Look up silent devices in the IPv6 neighbour table, read at most once per cycle.
+
+    Returns the records of the IPv6 addresses that did not answer, and the MAC
+    addresses in the table when a device tracked by MAC is silent at its IPv4
+    address, as it may still be seen over IPv6. Only scanners reading the
+    table look it up.
+    """
+    if not isinstance(scanner, NeighbourDiscoveryScanner):
+        return {}, set()
+
+    pending = [ip_address for ip_address in ip6_addresses if ip_address not in reachable_ip]
+    by_mac = any(
+        device.track_mac and device.mac_address and not is_ipv6(device.ip_address)
+        for device in probe.values()
+        if device.ip_address not in reachable_ip
+    )
+    if not pending and not by_mac:
+        return {}, set()
+
+    start = hass.loop.time()
+    neighbours = await scanner.get_ndp_records(hass, None if by_mac else pending)
+    sample.fetch_time = max(sample.fetch_time, hass.loop.time() - start)
+    ndp_records = {ip_address: neighbours[ip_address] for ip_address in pending if ip_address in neighbours}
+    return ndp_records, set(neighbours.values()) if by_mac else set()
+
+
+async def async_follow_devices(
+    hass: HomeAssistant,
+    scanner: Scanner,
+    scheduler: ProbeScheduler,
+    devices: dict[str, DeviceData],
+    lost: dict[str, DeviceData],
+) -> None:
+    """Move devices tracked by MAC to the address their MAC is now found at.
+
+    The neighbour table is read once and indexed by MAC, so each lost device is
+    a single lookup. A MAC is usually still found at its old address too, as
+    STALE entries keep it, so the free addresses other than the current one are
+    the candidates, the reachable ones first when there are several. Moved
+    devices are probed at their new address next cycle.
+    """
+    neighbours = await scanner.get_arp_records(hass, reachable=False)
+    by_mac: dict[str, list[str]] = {}
+    for ip_address, mac_address in neighbours.items():
+        by_mac.setdefault(mac_address, []).append(ip_address)
+    in_use = {device.ip_address for device in devices.values()}
+    reachable: dict[str, str] | None = None
+
+    for entry_id, device in lost.items():
+        candidates = [
+            ip_address
+            for ip_address in by_mac.get(device.mac_address, ())
+            if ip_address != device.ip_address and ip_address not in in_use
+        ]
+        if not candidates:
+            continue
+        if len(candidates) > 1:
+            if reachable is None:
+                reachable = await scanner.get_arp_records(hass)
+            candidates.sort(key=lambda ip_address: ip_address not in reachable)
+        ip_address = candidates[0]
+
+        _LOGGER.info(
+            "Device '%s' (%s) moved from %s to %s", device.title, device.mac_address, device.ip_address, ip_address
+        )
+        in_use.discard(device.ip_address)
+        in_use.add(ip_address)
+        device.ip_address = ip_address
+        scheduler.reschedule(entry_id)
+
+
+SCANNERS: dict[str, type[Scanner]] = {
+    "ip_route": ScannerIPRouteListener,
+    "ip_neigh": ScannerIPNeighMonitor,
+    "proc_net_arp": ScannerProcNetArp,
+    "arp": ScannerArp,
+}
+
+
+def _get_fingerprint() -> dict[str, Any]:
+    """Return the host capabilities the scanner selection depends on."""
+    return {
+        "kernel": platform.release(),
+        "pyroute2": find_spec("pyroute2") is not None,
+        "ip": shutil.which("ip"),
+        "arp": shutil.which("arp"),
+        "proc_net_arp": os.access(PROC_NET_ARP, os.R_OK),
+    }
 
 
 async def async_get_scanner(hass: HomeAssistant) -> Scanner:
-    """Return Scanner to use."""
+    """Return Scanner to use.
+
+    The scanner picked last time is reused as long as the host capabilities
+    are unchanged and it still reads the table, otherwise all scanners are
+    tried at once and the first working one in order of preference is picked.
+    Reading is checked too, as it can be blocked without the capabilities
+    changing, e.g. netlink by a new seccomp policy.
+    """
+    # Home Assistant is imported where used only, the agent runs without it
+    from homeassistant.helpers.storage import Store
+
+    store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+    fingerprint, stored = await asyncio.gather(hass.async_add_executor_job(_get_fingerprint), store.async_load())
 
-    if await ScannerIPRoute().get_arp_records(hass):
-        return ScannerIPRoute()
+    if stored and stored.get("fingerprint") == fingerprint and (scanner_class := SCANNERS.get(stored.get("scanner"))):
+        scanner = scanner_class()
+        if await scanner.get_arp_records(hass):
+            _LOGGER.debug("Using %s from last detection", scanner_class.__name__)
+            return scanner
+        _LOGGER.debug("%s from last detection returned nothing, detecting again", scanner_class.__name__)
 
-    if await ScannerIPNeigh().get_arp_records():
-        return ScannerIPNeigh()
+    name, scanner = await async_detect_scanner(hass)
+    await store.async_save({"scanner": name, "fingerprint": fingerprint})
+    return scanner
 
-    if await ScannerArp().get_arp_records():
-        return ScannerArp()
+
+async def async_detect_scanner(hass: HomeAssistant) -> tuple[str, Scanner]:
+    """Try all scanners at once, and return the first working one in order of preference with its name."""
+    scanners = [scanner_class() for scanner_class in SCANNERS.values()]
+    results = await asyncio.gather(*(scanner.get_arp_records(hass) for scanner in scanners))
+
+    for name, scanner, result in zip(SCANNERS, scanners, results):
+        if result:
+            _LOGGER.debug("Detected %s", scanner.__class__.__name__)
+            return name, scanner
 
     raise ScannerException("No scanner tool available")
@@ -0,0 +1,113 @@
+"""Probe scheduling for iPhone Detect."""
+
+from __future__ import annotations
+
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from .const import DEFAULT_PROBE_BACKOFF, DEFAULT_PROBE_BUDGET, DEFAULT_PROBE_BURST, PROBE_INTERVAL
+
+if TYPE_CHECKING:
+    from .scanner import DeviceData
+
+_LOGGER = logging.getLogger(__name__)
+
+# Tolerate rounding, a token earned just now counts
+TOKEN_TOLERANCE = 1e-6
+
+
+class TokenBucket:
+    """Pace probes to `rate` per second, allowing bursts of up to `burst`.
+
+    Times are seconds on the event loop clock.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated: float | None = None
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last refill."""
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, count: int, now: float) -> float:
+        """Return the seconds to wait until `count` tokens are available."""
+        self._refill(now)
+        missing = min(count, self.burst) - self._tokens
+        return missing / self.rate if missing > TOKEN_TOLERANCE else 0.0
+
+    def take(self, count: int, now: float) -> int:
+        """Take up to `count` tokens, and return how many were taken."""
+        self._refill(now)
+        taken = min(count, math.floor(self._tokens + TOKEN_TOLERANCE))
+        self._tokens -= taken
+        return taken
+
+
+class ProbeScheduler:
+    """Decide which devices to probe on each scan cycle.
+
+    A device that is home is probed once halfway through its consider_home
+    window and then on every cycle until it is seen again or expires. A device
+    that is away, or not seen since restart, is probed with an exponential
+    backoff capped at `backoff` seconds, every cycle by default, as an arrival
+    is noticed up to `backoff` seconds late. At most `budget` probes per second are
+    sent, the most overdue devices first, and `bucket` paces them to that rate
+    with bursts of up to `burst` probes.
+    """
+
+    def __init__(
+        self,
+        budget: float = DEFAULT_PROBE_BUDGET,
+        interval: float = PROBE_INTERVAL,
+        burst: int = DEFAULT_PROBE_BURST,
+        backoff: float = DEFAULT_PROBE_BACKOFF,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.interval = timedelta(seconds=interval)
+        self.backoff = max(self.interval, timedelta(seconds=backoff))
+        self.max_probes = max(1, int(budget * interval))
+        self.bucket = TokenBucket(budget, burst)
+        self._next_probe: dict[str, datetime] = {}
+        self._backoff: dict[str, timedelta] = {}
+
+    def due(self, devices: dict[str, DeviceData], now: datetime) -> list[str]:
+        """Return entry ids of devices to probe this cycle."""
+        for entry_id in self._next_probe.keys() - devices.keys():
+            del self._next_probe[entry_id]
+            self._backoff.pop(entry_id, None)
+
+        due = [entry_id for entry_id in devices if self._next_probe.get(entry_id, now) <= now]
+        if len(due) > self.max_probes:
+            due.sort(key=lambda entry_id: self._next_probe.get(entry_id, now))
+            _LOGGER.debug("Probe budget exceeded, postponing %d devices", len(due) - self.max_probes)
+            del due[self.max_probes :]
+
+        return due
+
+    def update(self, entry_id: str, device: DeviceData, now: datetime) -> None:
+        """Schedule the next probe of a device after it was probed."""
+        if device._last_seen is not None and (age := now - device._last_seen) < device.consider_home:
+            self._backoff.pop(entry_id, None)
+            halfway = device.consider_home / 2
+            next_probe = now + max(halfway - age, self.interval)
+        else:
+            backoff = self._backoff[entry_id] = min(
+                self._backoff.get(entry_id, self.interval / 2) * 2,
+                self.backoff,
+            )
+            next_probe = now + backoff
+
+        self._next_probe[entry_id] = next_probe
+
+    def reschedule(self, entry_id: str) -> None:
+        """Probe a device on the next cycle."""
+        self._next_probe.pop(entry_id, None)
+        self._backoff.pop(entry_id, None)
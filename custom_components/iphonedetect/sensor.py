@@ -0,0 +1,107 @@
+"""Sensor platform for iPhone Detect scan statistics."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, SIGNAL_SCAN_STATS
+from .stats import CycleSample, ScanStats, percentiles
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+
+@dataclass(frozen=True, kw_only=True)
+class IphoneDetectSensorEntityDescription(SensorEntityDescription):
+    """Describe a scan statistics sensor."""
+
+    value_fn: Callable[[CycleSample], float | None]
+
+
+SENSORS: tuple[IphoneDetectSensorEntityDescription, ...] = (
+    IphoneDetectSensorEntityDescription(
+        key="scanner_latency",
+        translation_key="scanner_latency",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=1,
+        value_fn=lambda sample: sample.fetch_time * 1000,
+    ),
+    IphoneDetectSensorEntityDescription(
+        key="neighbour_records",
+        translation_key="neighbour_records",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda sample: sample.records,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Setup scan statistics sensors, once for all entries."""
+
+    data: dict[str, Any] = hass.data[DOMAIN]
+    if data["stats_entry"] != entry.entry_id:
+        return
+
+    stats: ScanStats = data["scan_stats"]
+
+    async_add_entities(IphoneDetectStatsSensor(stats, description) for description in SENSORS)
+
+
+class IphoneDetectStatsSensor(SensorEntity):
+    """Sensor showing a scan statistic from the last cycle."""
+
+    entity_description: IphoneDetectSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(self, stats: ScanStats, description: IphoneDetectSensorEntityDescription) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}_{description.key}"
+        self._stats = stats
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to scan cycles."""
+        await super().async_added_to_hass()
+        self.async_on_remove(async_dispatcher_connect(self.hass, SIGNAL_SCAN_STATS, self._handle_scan))
+
+    @callback
+    def _handle_scan(self) -> None:
+        """Write the statistic after each scan cycle."""
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the value from the last cycle."""
+        sample = self._stats.last_sample
+        return self.entity_description.value_fn(sample) if sample is not None else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return percentiles over the kept cycles that have a value."""
+        return percentiles(
+            value
+            for sample in self._stats.samples
+            if (value := self.entity_description.value_fn(sample)) is not None
+        )
@@ -0,0 +1,106 @@
+"""Services for iPhone Detect."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import logging
+from typing import TYPE_CHECKING, Any
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.components.device_tracker import CONF_CONSIDER_HOME
+from homeassistant.config_entries import SOURCE_IMPORT
+from homeassistant.const import CONF_DEVICES, CONF_IP_ADDRESS, CONF_NAME
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DEFAULT_CONSIDER_HOME, DOMAIN
+from .validation import async_validate_devices
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant, ServiceCall
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_IMPORT_DEVICES = "import_devices"
+ATTR_FILE = "file"
+
+DEVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_IP_ADDRESS): cv.string,
+        vol.Optional(CONF_CONSIDER_HOME, default=DEFAULT_CONSIDER_HOME): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    }
+)
+
+IMPORT_DEVICES_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Exclusive(ATTR_FILE, "source"): cv.string,
+            vol.Exclusive(CONF_DEVICES, "source"): [DEVICE_SCHEMA],
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_FILE, CONF_DEVICES),
+)
+
+
+def _read_devices_file(path: str) -> list[dict[str, Any]]:
+    """Return devices from a CSV file with name, ip_address and optional consider_home columns."""
+    devices = []
+    with open(path, newline="", encoding="utf-8") as file:
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            try:
+                devices.append(DEVICE_SCHEMA({key: value for key, value in row.items() if value}))
+            except vol.Invalid as error:
+                _LOGGER.warning("Skipping line %d of %s: %s", line, path, error)
+
+    return devices
+
+
+async def _async_import_devices(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Create a config entry for each imported device."""
+    if (file := call.data.get(ATTR_FILE)) is not None:
+        path = hass.config.path(file)
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Access to {path} is not allowed")
+        try:
+            devices = await hass.async_add_executor_job(_read_devices_file, path)
+        except OSError as error:
+            raise HomeAssistantError(f"Could not read {path}: {error}") from error
+    else:
+        devices = call.data[CONF_DEVICES]
+
+    # Validate all devices in one pass, which also catches duplicates within the import
+    valid = []
+    for device, error in zip(devices, await async_validate_devices(hass, devices)):
+        if error is not None:
+            _LOGGER.warning("Device '%s' not imported: %s", device[CONF_NAME], error)
+        else:
+            valid.append(device)
+
+    results = await asyncio.gather(
+        *(
+            hass.config_entries.flow.async_init(DOMAIN, context={"source": SOURCE_IMPORT}, data=device)
+            for device in valid
+        )
+    )
+
+    for device, result in zip(valid, results):
+        if result["type"] != FlowResultType.CREATE_ENTRY:
+            _LOGGER.warning("Device '%s' not imported: %s", device[CONF_NAME], result.get("reason"))
+
+    _LOGGER.info(
+        "Imported %d of %d devices",
+        sum(result["type"] == FlowResultType.CREATE_ENTRY for result in results),
+        len(devices),
+    )
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services."""
+
+    async def _import_devices(call: ServiceCall) -> None:
+        await _async_import_devices(hass, call)
+
+    hass.services.async_register(DOMAIN, SERVICE_IMPORT_DEVICES, _import_devices, schema=IMPORT_DEVICES_SCHEMA)
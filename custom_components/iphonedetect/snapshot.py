@@ -0,0 +1,115 @@
+"""Reachability snapshot for iPhone Detect."""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, SNAPSHOT_SAVE_DELAY
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .scanner import DeviceData
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.reachability"
+STORAGE_VERSION = 1
+
+
+class ReachabilitySnapshot:
+    """Last sighting of every tracked device, kept across restarts and reloads.
+
+    Loaded once at setup, and restored into each device as its entry is set
+    up, so presence is known from the first scan instead of after a full
+    consider_home. Saves are coalesced, at most one every SNAPSHOT_SAVE_DELAY
+    however often they are asked for, and a pending save is written when Home
+    Assistant stops.
+
+    Devices are kept by entry id as `[configured, ip_address, mac_address,
+    last_seen, reachable]`, with the IP address of the entry as configured, the
+    one the device was followed to, and last_seen as a timestamp. Devices never
+    seen are left out.
+    """
+
+    def __init__(self, hass: HomeAssistant, devices: dict[str, DeviceData]) -> None:
+        """Initialize an empty snapshot of `devices`."""
+        self.hass = hass
+        self.devices = devices
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._stored: dict[str, list[Any]] = {}
+        self._configured: dict[str, str] = {}
+        self._save_pending = False
+
+    async def async_load(self) -> None:
+        """Load the snapshot saved last."""
+        if stored := await self._store.async_load():
+            self._stored = stored.get("devices", {})
+        _LOGGER.debug("Loaded reachability of %d devices", len(self._stored))
+
+    def restore(self, entry_id: str, device: DeviceData) -> None:
+        """Restore the last sighting of a device being set up.
+
+        Nothing is restored when its IP address was reconfigured meanwhile. A
+        device tracked by MAC is followed at the address it was last found at.
+        A device is reachable only within consider_home of its last sighting,
+        until scanned again.
+        """
+        self._configured[entry_id] = device.ip_address
+        if (stored := self._stored.get(entry_id)) is None:
+            return
+        configured, ip_address, mac_address, last_seen, reachable = stored
+        if configured != device.ip_address:
+            return
+
+        if device.track_mac:
+            device.ip_address = ip_address
+        device.mac_address = mac_address
+        device._last_seen = datetime.fromtimestamp(last_seen, timezone.utc)
+        device._reachable = reachable and dt_util.utcnow() - device._last_seen < device.consider_home
+        _LOGGER.debug("Restored '%s' (%s), last seen %s", device.title, ip_address, device._last_seen)
+
+    def keep(self, entry_id: str, device: DeviceData) -> None:
+        """Keep the last sighting of a device, e.g. when its entry is unloaded, for when it is set up again."""
+        if device._last_seen is not None:
+            self._stored[entry_id] = [
+                self._configured.get(entry_id, device.ip_address),
+                device.ip_address,
+                device.mac_address,
+                device._last_seen.timestamp(),
+                device._reachable,
+            ]
+
+    def forget(self, entry_id: str) -> None:
+        """Drop a removed device."""
+        self._stored.pop(entry_id, None)
+        self._configured.pop(entry_id, None)
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save the snapshot within SNAPSHOT_SAVE_DELAY, unless a save is already pending."""
+        if self._save_pending:
+            return
+        # The store restarts its delay on every call, it is called only once per save
+        self._save_pending = True
+        self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the snapshot of the devices, with the ones not set up as they were."""
+        self._save_pending = False
+        for entry_id, device in self.devices.items():
+            self.keep(entry_id, device)
+        # Entries removed while not loaded are never forgotten otherwise
+        self._stored = {
+            entry_id: stored
+            for entry_id, stored in self._stored.items()
+            if self.hass.config_entries.async_get_entry(entry_id) is not None
+        }
+        return {"devices": self._stored}
@@ -0,0 +1,77 @@
+"""Scan cycle statistics for iPhone Detect."""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Iterable
+
+from .const import STATS_SAMPLES
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass(slots=True, kw_only=True)
+class CycleSample:
+    """Timings and counts for a single scan cycle, durations in seconds.
+
+    Probes are checked in batches, `fetch_time` is the slowest ARP lookup.
+    `records` is the number of reachable neighbours in the table after the
+    cycle, None when the scanner only looked up the tracked addresses.
+    """
+
+    probes: int = 0
+    probe_time: float = 0
+    replies: int = 0
+    fetch_time: float = 0
+    records: int | None = None
+    matches: int = 0
+    refresh_time: float = 0
+
+
+def percentiles(values: Iterable[float]) -> dict[str, float]:
+    """Return the nearest-rank percentiles of `values`."""
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {f"p{q}": ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)] for q in PERCENTILES}
+
+
+@dataclass(slots=True)
+class ScanStats:
+    """Scan cycle counters since setup, and the most recent cycle samples."""
+
+    cycles: int = 0
+    overruns: int = 0
+    skipped: int = 0
+    last_duration: float = 0
+    max_duration: float = 0
+    samples: deque[CycleSample] = field(default_factory=lambda: deque(maxlen=STATS_SAMPLES))
+
+    @property
+    def last_sample(self) -> CycleSample | None:
+        """Return the most recent sample."""
+        return self.samples[-1] if self.samples else None
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Return percentiles per stage over the kept samples."""
+        return {
+            stage.name: percentiles(
+                value for sample in self.samples if (value := getattr(sample, stage.name)) is not None
+            )
+            for stage in fields(CycleSample)
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters and summaries."""
+        return {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "samples": len(self.samples),
+            "last_sample": asdict(sample) if (sample := self.last_sample) else None,
+            "summary": self.summary(),
+        }
@@ -0,0 +1,136 @@
+"""Validation of tracked devices for iPhone Detect."""
+
+from __future__ import annotations
+
+import ipaddress
+import logging
+from typing import TYPE_CHECKING, Any, Iterable, Sequence
+
+from homeassistant.const import CONF_IP_ADDRESS, CONF_NAME
+from homeassistant.core import callback
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .interfaces import InterfaceMap
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_ENTRY_INDEX = "entry_index"
+DATA_NETWORKS = "networks"
+CONF_SUBNET_CHECK = "subnet_check"
+
+
+def device_unique_id(name: str) -> str:
+    """Return the unique id of the entry of a device named `name`."""
+    return f"{DOMAIN}_{slugify(name).lower()}"
+
+
+class EntryIndex:
+    """Unique ids and IP addresses of the config entries, for duplicate checks in constant time.
+
+    Built from the entries on first use, then kept up to date by the flows
+    adding entries. It is dropped with `async_invalidate_entry_index` when
+    entries are changed or removed, and built again on next use.
+    """
+
+    def __init__(self, entries: Iterable[ConfigEntry]) -> None:
+        """Index the entries."""
+        self.unique_ids: set[str | None] = set()
+        self.ip_addresses: set[str] = set()
+        for entry in entries:
+            self.unique_ids.add(entry.unique_id)
+            self.ip_addresses.add(entry.options[CONF_IP_ADDRESS])
+
+    def add(self, unique_id: str, ip_address: str) -> None:
+        """Index an entry being created."""
+        self.unique_ids.add(unique_id)
+        self.ip_addresses.add(ip_address)
+
+
+@callback
+def async_get_entry_index(hass: HomeAssistant) -> EntryIndex:
+    """Return the index of the config entries, building it when needed."""
+    data: dict[str, Any] = hass.data.setdefault(DOMAIN, {})
+    if (index := data.get(DATA_ENTRY_INDEX)) is None:
+        index = data[DATA_ENTRY_INDEX] = EntryIndex(hass.config_entries.async_entries(DOMAIN))
+    return index
+
+
+@callback
+def async_invalidate_entry_index(hass: HomeAssistant) -> None:
+    """Drop the index of the config entries after they changed."""
+    hass.data.get(DOMAIN, {}).pop(DATA_ENTRY_INDEX, None)
+
+
+async def async_get_outside_networks(hass: HomeAssistant, ip_addresses: Sequence[str]) -> set[str]:
+    """Return the addresses outside every network attached to Home Assistant.
+
+    Networks are read at most every INTERFACE_REFRESH_INTERVAL, and once more
+    when an address is outside all of them, in case a network was attached since.
+    """
+    networks: InterfaceMap = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_NETWORKS, InterfaceMap())
+    await networks.async_refresh(hass)
+    outside = {ip_address for ip_address in ip_addresses if networks.get(ip_address) is None}
+
+    if outside:
+        networks.invalidate()
+        if await networks.async_refresh(hass):
+            outside = {ip_address for ip_address in outside if networks.get(ip_address) is None}
+
+    return outside
+
+
+async def async_validate_devices(hass: HomeAssistant, devices: Sequence[dict[str, Any]]) -> list[str | None]:
+    """Return the error of each device, None when valid, checking all of them in one pass.
+
+    Names and IP addresses must not be used by a config entry, nor by a device
+    earlier in `devices`. Unless `subnet_check` is unset, the IP address must be
+    in a network attached to Home Assistant. IPv4 and IPv6 addresses are
+    accepted, valid ones are normalized in place so each address has one form.
+    """
+    index = async_get_entry_index(hass)
+    unique_ids: set[str] = set()
+    ip_addresses: set[str] = set()
+    errors: list[str | None] = []
+
+    for device in devices:
+        # Check if name already used for a clearer error
+        if device.get(CONF_NAME):
+            unique_id = device_unique_id(device[CONF_NAME])
+            if unique_id in index.unique_ids or unique_id in unique_ids:
+                errors.append("name_not_unique")
+                continue
+            unique_ids.add(unique_id)
+
+        # Check if valid IP address
+        try:
+            ip_address = device[CONF_IP_ADDRESS] = str(ipaddress.ip_address(device[CONF_IP_ADDRESS]))
+        except ValueError:
+            errors.append("ip_invalid")
+            continue
+
+        # Check if IP address already used for a clearer error
+        if ip_address in index.ip_addresses or ip_address in ip_addresses:
+            errors.append("ip_already_configured")
+            continue
+        ip_addresses.add(ip_address)
+        errors.append(None)
+
+    # Check if device IP will be seen by ARP
+    subnet_check = [
+        device[CONF_IP_ADDRESS]
+        for device, error in zip(devices, errors)
+        if error is None and device.get(CONF_SUBNET_CHECK, True)
+    ]
+    if subnet_check and (outside := await async_get_outside_networks(hass, subnet_check)):
+        errors = [
+            "ip_range" if error is None and device[CONF_IP_ADDRESS] in outside else error
+            for device, error in zip(devices, errors)
+        ]
+
+    _LOGGER.debug("Validated %d devices, %d invalid", len(devices), sum(error is not None for error in errors))
+    return errors